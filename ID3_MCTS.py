@@ -2,6 +2,11 @@ import numpy as np
 import pandas as pd
 from collections import Counter
 import random
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+
+from dataset_store import feature_columns, load_arrays, num_rows
+from symmetry import canonical_features, mirror_move
 
 # ------------------- Funções de Entropia -------------------
 def entropy(y):
@@ -14,6 +19,28 @@ def information_gain(parent, left, right):
     weight_r = len(right) / len(parent)
     return entropy(parent) - (weight_l * entropy(left) + weight_r * entropy(right))
 
+_entropy_cache = {}  # Só dura um treino (ver _entropy_scope)
+
+@contextmanager
+def _entropy_scope():
+    # Esvazia a cache de entropias no início e no fim de cada fit, para não
+    # crescer de treino para treino
+    _entropy_cache.clear()
+    try:
+        yield
+    finally:
+        _entropy_cache.clear()
+
+def entropy_counts(counts):
+    # Mesmo resultado que entropy() (as mesmas operações, pela mesma ordem),
+    # mas a partir das contagens por classe em ordem crescente de classe
+    key = counts.tobytes()
+    if key not in _entropy_cache:
+        counts = counts[counts > 0]
+        probs = counts / counts.sum()
+        _entropy_cache[key] = -np.sum([p * np.log2(p) for p in probs if p > 0])
+    return _entropy_cache[key]
+
 # ------------------- Nó da Árvore -------------------
 class TreeNode:
     def __init__(self, feature=None, threshold=None, left=None, right=None, value=None):
@@ -25,12 +52,67 @@ class TreeNode:
 
 # ------------------- Árvore de Decisão -------------------
 class DecisionTree:
-    def __init__(self, max_depth=10):
+    # splitter="histogram" procura o melhor corte com contagens por classe;
+    # "exhaustive" é a procura original (máscaras e entropia por limiar).
+    # Ambos produzem exatamente a mesma árvore.
+    # Com workers > 1 (só no histogram) o treino usa um pool de processos:
+    # até à profundidade parallel_depth cada corte é procurado com as
+    # features repartidas pelos processos; a partir daí cada subárvore é
+    # construída inteira num processo. A árvore é a mesma que com workers=1.
+    def __init__(self, max_depth=10, splitter="histogram", workers=1, parallel_depth=2):
         self.max_depth = max_depth
+        self.splitter = splitter
+        self.workers = workers
+        self.parallel_depth = parallel_depth
         self.root = None
+        self.canonical = False  # Treinada só com posições na orientação canónica
 
     def fit(self, X, y):
-        self.root = self._grow(X, y)
+        with _entropy_scope():
+            if getattr(self, "splitter", "histogram") == "exhaustive":
+                self.root = self._grow(X, y)
+            else:
+                # Valores e classes passam a índices pequenos (mesma ordem), para
+                # contar por (feature, valor, classe) com um só bincount por nó
+                values = np.unique(X)
+                codes = np.searchsorted(values, X).astype(np.uint8 if len(values) <= 256 else np.int64)
+                classes, y_codes = np.unique(y, return_inverse=True)
+                workers = getattr(self, "workers", 1)
+                if workers > 1:
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        root = self._grow_histogram(codes, y, y_codes, values, len(classes), 0, executor)
+                        self.root = _resolve_subtrees(root)
+                else:
+                    self.root = self._grow_histogram(codes, y, y_codes, values, len(classes))
+            self.compile()
+
+    def compile(self):
+        # Converte a árvore em arrays planos (nós em pré-ordem, folhas com
+        # feature -1) para o predict vetorizado
+        feature, threshold, left, right, value = [], [], [], [], []
+        stack = [(self.root, -1, False)]
+        while stack:
+            node, parent, is_right = stack.pop()
+            index = len(feature)
+            if parent >= 0:
+                (right if is_right else left)[parent] = index
+            leaf = node.value is not None
+            feature.append(-1 if leaf else node.feature)
+            threshold.append(0 if leaf else node.threshold)
+            left.append(-1)
+            right.append(-1)
+            value.append(node.value if leaf else 0)
+            if not leaf:
+                stack.append((node.right, index, True))
+                stack.append((node.left, index, False))
+        self.flat = {
+            "feature": np.array(feature, dtype=np.int64),
+            "threshold": np.array(threshold, dtype=np.float64),
+            "left": np.array(left, dtype=np.int64),
+            "right": np.array(right, dtype=np.int64),
+            "value": np.array(value),
+        }
+        return self.flat
 
     def _grow(self, X, y, depth=0):
         if len(set(y)) == 1 or depth == self.max_depth:
@@ -59,8 +141,185 @@ class DecisionTree:
         right = self._grow(X[right_mask], y[right_mask], depth + 1)
         return TreeNode(feature=f, threshold=t, left=left, right=right)
 
+    def _grow_histogram(self, codes, y, y_codes, values, num_classes, depth=0, executor=None):
+        # Igual a _grow, com o corte escolhido por _best_split. Com executor,
+        # as subárvores a partir de parallel_depth ficam como Future (ver
+        # _resolve_subtrees)
+        if len(set(y)) == 1 or depth == self.max_depth:
+            return TreeNode(value=Counter(y).most_common(1)[0][0])
+
+        if executor is not None and depth >= self.parallel_depth:
+            return executor.submit(_grow_subtree, self.max_depth, codes, y, y_codes, values,
+                                   num_classes, depth)
+        if executor is not None:
+            best_split = self._best_split_parallel(codes, y_codes, len(values), num_classes, executor)
+        else:
+            best_split = self._best_split(codes, y_codes, len(values), num_classes)
+        if best_split is None:
+            return TreeNode(value=Counter(y).most_common(1)[0][0])
+
+        _, f, code = best_split
+        left_mask = codes[:, f] <= code
+        right_mask = ~left_mask
+        left = self._grow_histogram(codes[left_mask], y[left_mask], y_codes[left_mask],
+                                    values, num_classes, depth + 1, executor)
+        right = self._grow_histogram(codes[right_mask], y[right_mask], y_codes[right_mask],
+                                     values, num_classes, depth + 1, executor)
+        return TreeNode(feature=f, threshold=values[code], left=left, right=right)
+
+    def _best_split_parallel(self, codes, y_codes, num_values, num_classes, executor):
+        # Cada processo procura o melhor corte num bloco contíguo de features;
+        # percorrer os blocos por ordem com ">" escolhe o mesmo corte que a
+        # procura sequencial (o primeiro com o maior ganho)
+        bounds = np.linspace(0, codes.shape[1], self.workers + 1).astype(int)
+        futures = [
+            (first, executor.submit(DecisionTree._best_split, codes[:, first:last], y_codes,
+                                    num_values, num_classes))
+            for first, last in zip(bounds[:-1], bounds[1:]) if last > first
+        ]
+        best_split = None
+        for first, future in futures:
+            split = future.result()
+            if split is not None and (best_split is None or split[0] > best_split[0]):
+                best_split = (split[0], split[1] + first, split[2])
+        return best_split
+
+    @staticmethod
+    def _best_split(codes, y_codes, num_values, num_classes):
+        # Devolve (ganho, feature, código do limiar) ou None
+        return DecisionTree._split_from_histogram(
+            _class_histogram(codes, y_codes, num_values, num_classes))
+
+    @staticmethod
+    def _split_from_histogram(hist):
+        # hist[feature, valor, classe] conta as amostras do nó; a soma
+        # acumulada sobre os valores dá as contagens à esquerda de cada
+        # limiar. Os ganhos são calculados como em information_gain e
+        # comparados pela mesma ordem (feature, limiar crescente) que em _grow.
+        num_features, v, _ = hist.shape
+        left = np.cumsum(hist, axis=1)
+        parent_counts = left[0, -1]
+        n = int(parent_counts.sum())
+        parent_entropy = entropy_counts(parent_counts)
+
+        # Limiares: valores presentes de cada feature, menos o maior (a
+        # direita ficaria vazia); np.nonzero mantém a ordem (feature, valor)
+        candidates = hist.sum(axis=2) > 0
+        last = v - 1 - np.argmax(candidates[:, ::-1], axis=1)
+        candidates[np.arange(num_features), last] = False
+        features, indices = np.nonzero(candidates)
+        left_sizes = left.sum(axis=2)[features, indices].tolist()
+
+        best_gain = -1
+        best_split = None
+        for feature, i, n_left in zip(features.tolist(), indices.tolist(), left_sizes):
+            left_counts = left[feature, i]
+            weight_l = n_left / n
+            weight_r = (n - n_left) / n
+            gain = parent_entropy - (weight_l * entropy_counts(left_counts)
+                                     + weight_r * entropy_counts(parent_counts - left_counts))
+            if gain > best_gain:
+                best_gain = gain
+                best_split = (gain, feature, i)
+        return best_split
+
+    def fit_stream(self, chunks):
+        # Treino sem ter o dataset em memória: `chunks` é uma função sem
+        # argumentos que devolve um iterável de blocos (X, y) (ver
+        # iter_chunks) e é chamada uma vez por nível da árvore. Em cada
+        # passagem os blocos descem a parte já construída da árvore e os
+        # histogramas por (nó, feature, valor, classe) dos nós do nível são
+        # somados; com eles cada nó é decidido como em _grow_histogram, por
+        # isso a árvore é a mesma que fit() com os blocos concatenados.
+        with _entropy_scope():
+            values, classes = None, None
+            for X, y in chunks():
+                X_values, y_values = np.unique(X), np.unique(y)
+                values = X_values if values is None else np.union1d(values, X_values)
+                classes = y_values if classes is None else np.union1d(classes, y_values)
+            if values is None:
+                raise ValueError("fit_stream needs at least one chunk")
+            num_values, num_classes = len(values), len(classes)
+
+            # A árvore em construção em arrays para encaminhar as linhas: nós
+            # internos com feature >= 0, folhas e nós por decidir com -1
+            nodes = [TreeNode()]
+            feature, code, left, right = [-1], [0], [-1], [-1]
+            frontier = [0]
+            for depth in range(self.max_depth + 1):
+                if not frontier:
+                    break
+                slots = np.full(len(nodes), -1)
+                slots[frontier] = np.arange(len(frontier))
+                routing = [np.array(a) for a in (feature, code, left, right)]
+                hist, first = None, np.full((len(frontier), num_classes), np.iinfo(np.int64).max)
+                offset = 0
+                for X, y in chunks():
+                    codes = np.searchsorted(values, X)
+                    y_codes = np.searchsorted(classes, y)
+                    slot = slots[_route(codes, *routing)]
+                    rows = np.flatnonzero(slot >= 0)
+                    chunk_hist = _class_histogram(codes[rows], y_codes[rows], num_values, num_classes,
+                                                  slot[rows], len(frontier))
+                    hist = chunk_hist if hist is None else hist + chunk_hist
+                    # Primeira linha de cada classe em cada nó: desempate igual ao Counter
+                    np.minimum.at(first, (slot[rows], y_codes[rows]), offset + rows)
+                    offset += len(X)
+
+                next_frontier = []
+                for s, index in enumerate(frontier):
+                    class_counts = hist[s, 0].sum(axis=0)
+                    best_split = None
+                    if np.count_nonzero(class_counts) > 1 and depth < self.max_depth:
+                        best_split = self._split_from_histogram(hist[s])
+                    if best_split is None:
+                        top = np.flatnonzero(class_counts == class_counts.max())
+                        nodes[index].value = classes[top[np.argmin(first[s, top])]]
+                        continue
+                    _, f, c = best_split
+                    node = nodes[index]
+                    node.feature, node.threshold = f, values[c]
+                    node.left, node.right = TreeNode(), TreeNode()
+                    feature[index], code[index] = f, c
+                    left[index], right[index] = len(nodes), len(nodes) + 1
+                    next_frontier += [len(nodes), len(nodes) + 1]
+                    nodes += [node.left, node.right]
+                    feature += [-1, -1]
+                    code += [0, 0]
+                    left += [-1, -1]
+                    right += [-1, -1]
+                frontier = next_frontier
+            self.root = nodes[0]
+            self.compile()
+
     def predict(self, X):
-        return np.array([self._traverse(x, self.root) for x in X])
+        # Todas as linhas descem a árvore ao mesmo tempo, um nível por passo
+        flat = getattr(self, "flat", None)  # Árvores guardadas antes não o têm
+        if flat is None:
+            flat = self.compile()
+        X = np.asarray(X)
+        feature, threshold = flat["feature"], flat["threshold"]
+        nodes = np.zeros(len(X), dtype=np.int64)
+        active = np.flatnonzero(feature[nodes] >= 0)
+        while active.size:
+            current = nodes[active]
+            go_left = X[active, feature[current]] <= threshold[current]
+            nodes[active] = np.where(go_left, flat["left"][current], flat["right"][current])
+            active = active[feature[nodes[active]] >= 0]
+        return flat["value"][nodes]
+
+    def predict_one(self, x):
+        # Uma só linha: descer os nós diretamente é mais rápido que o predict
+        if self.root is None:  # Carregada do model_store: só tem os arrays
+            flat = self.flat
+            node = 0
+            while flat["feature"][node] >= 0:
+                if x[flat["feature"][node]] <= flat["threshold"][node]:
+                    node = flat["left"][node]
+                else:
+                    node = flat["right"][node]
+            return flat["value"][node]
+        return self._traverse(x, self.root)
 
     def _traverse(self, x, node):
         if node.value is not None:
@@ -83,6 +342,44 @@ class DecisionTree:
             print(f"{indent}else:")
             self.print_tree(node.right, depth + 1, feature_names)
 
+def _grow_subtree(max_depth, codes, y, y_codes, values, num_classes, depth):
+    # Corre num processo à parte: constrói uma subárvore inteira
+    tree = DecisionTree(max_depth)
+    return tree._grow_histogram(codes, y, y_codes, values, num_classes, depth)
+
+def _class_histogram(codes, y_codes, num_values, num_classes, node=None, num_nodes=1):
+    # Conta as amostras por (nó, feature, valor, classe) com um só bincount;
+    # sem `node` todas as linhas são do mesmo nó e o resultado é
+    # (features, valores, classes)
+    n, num_features = codes.shape
+    v, k = num_values, num_classes
+    flat = codes * np.int64(k) + (np.arange(num_features) * v * k)[None, :] + y_codes[:, None]
+    if node is not None:
+        flat += (node * (num_features * v * k))[:, None]
+    hist = np.bincount(flat.ravel(), minlength=num_nodes * num_features * v * k)
+    hist = hist.reshape(num_nodes, num_features, v, k)
+    return hist[0] if node is None else hist
+
+def _route(codes, feature, code, left, right):
+    # Nó (índice) onde cada linha para ao descer a árvore em construção
+    nodes = np.zeros(len(codes), dtype=np.int64)
+    active = np.flatnonzero(feature[nodes] >= 0)
+    while active.size:
+        current = nodes[active]
+        go_left = codes[active, feature[current]] <= code[current]
+        nodes[active] = np.where(go_left, left[current], right[current])
+        active = active[feature[nodes[active]] >= 0]
+    return nodes
+
+def _resolve_subtrees(node):
+    # Substitui as subárvores ainda por calcular (Future) pelo seu resultado
+    if isinstance(node, Future):
+        return node.result()
+    if node.value is None:
+        node.left = _resolve_subtrees(node.left)
+        node.right = _resolve_subtrees(node.right)
+    return node
+
 def extract_features(board, current_player):
     features = []
     for row in board:
@@ -94,7 +391,15 @@ def extract_features(board, current_player):
 
 def predict_connect4_move(tree, board, current_player, valid_moves):
     features = extract_features(board, current_player)
-    pred = tree.predict(features)[0]
+    # Árvores treinadas com posições canónicas: consulta a orientação
+    # canónica e desfaz o espelho na jogada prevista
+    mirrored = False
+    if getattr(tree, "canonical", False):
+        features, _, flags = canonical_features(features)
+        mirrored = flags[0]
+    pred = tree.predict_one(features[0])
+    if mirrored:
+        pred = mirror_move(pred)
     # Verifica se o movimento previsto é válido, caso contrário escolhe um válido random
     if pred not in valid_moves:
         pred = random.choice(valid_moves)
@@ -115,13 +420,64 @@ def confusion_matrix(y_true, y_pred):
     return mat
 
 # 1. Carregar dados
-def train_tree():
-    # 1. Carregar dados
-    df = pd.read_csv("connect4_mcts_dataset.csv")
-    df = df.dropna(subset=['move'])  # remover linhas com move = None
+DEFAULT_DATASET = "connect4_mcts_dataset.c4"
+
+def load_dataset(path=DEFAULT_DATASET):
+    if path.endswith(".csv"):
+        df = pd.read_csv(path)
+        df = df.dropna(subset=['move'])  # remover linhas com move = None
+
+        X = df.iloc[:, feature_columns(df.columns)].values
+        y = df['move'].astype(int).values
+        canonical = False
+    else:
+        # Ficheiro binário (dataset_store): X e y são vistas do memmap, sem cópia
+        X, y, header = load_arrays(path)
+        canonical = header.get("canonical", False)
+
+    # 2. Posições espelhadas passam a ser a mesma posição
+    if not canonical:
+        X, y, _ = canonical_features(X, y)
+    return X, y
+
+def iter_chunks(paths, chunk_rows=65536, start=0, stop=None):
+    # Percorre um ou vários ficheiros binários (dataset final ou shards do
+    # dataset_generator) em blocos (X, y) de até chunk_rows linhas; só cada
+    # bloco é lido do memmap. start/stop são índices das linhas no conjunto
+    # dos ficheiros, pela ordem dada
+    if isinstance(paths, str):
+        paths = [paths]
+    offset = 0
+    for path in paths:
+        X, y, header = load_arrays(path)
+        first = max(start - offset, 0)
+        last = len(X) if stop is None else min(stop - offset, len(X))
+        for i in range(first, last, chunk_rows):
+            X_chunk = np.asarray(X[i:min(i + chunk_rows, last)])
+            y_chunk = np.asarray(y[i:min(i + chunk_rows, last)])
+            if not header.get("canonical", False):
+                X_chunk, y_chunk, _ = canonical_features(X_chunk, y_chunk)
+            yield X_chunk, y_chunk
+        offset += len(X)
+
+def train_tree(workers=1, dataset=DEFAULT_DATASET, chunk_rows=None):
+    # Com chunk_rows o dataset (um ficheiro binário ou uma lista de shards)
+    # nunca é carregado inteiro: treino com fit_stream e avaliação por blocos
+    if chunk_rows:
+        paths = [dataset] if isinstance(dataset, str) else list(dataset)
+        split = int(0.7 * sum(num_rows(path) for path in paths))
+        tree = DecisionTree(max_depth=10)
+        tree.fit_stream(lambda: iter_chunks(paths, chunk_rows, 0, split))
+        tree.canonical = True
+        hits = total = 0
+        for X_test, y_test in iter_chunks(paths, chunk_rows, split):
+            hits += np.sum(tree.predict(X_test) == y_test)
+            total += len(y_test)
+        print(f"ID3 Accuracy: {hits / max(total, 1):.2f}")
+        return tree
 
-    X = df.drop(columns=['move']).values
-    y = df['move'].astype(int).values   
+    # 1. e 2. Carregar dados
+    X, y = load_dataset(dataset)
 
     # 3. Dividir treino/teste
     split = int(0.7 * len(X))
@@ -129,8 +485,9 @@ def train_tree():
     y_train, y_test = y[:split], y[split:]
 
     # 4. Treinar árvore
-    tree = DecisionTree(max_depth=10)
+    tree = DecisionTree(max_depth=10, workers=workers)
     tree.fit(X_train, y_train)
+    tree.canonical = True
 
     # 5. Avaliar (opcional)
     y_pred = tree.predict(X_test)
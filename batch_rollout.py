@@ -0,0 +1,105 @@
+"""Many Connect Four playouts at once on arrays of bitboards.
+
+``simulate(game, n)`` plays ``n`` games from the position of ``game`` in
+lockstep: every game is a pair of ``uint64`` bitboards (same layout as
+``ConnectFour``: ``bit = column * (rows + 1) + row``) plus a row of column
+heights, and each ply samples a move, drops a piece and tests for a line in
+all unfinished games with a handful of NumPy operations. Finished games are
+dropped from the working arrays, so late plies only touch the games still
+running.
+
+Policies are the batch versions of ``rollout_policies``: "random" (uniform
+over the legal columns) and "tactical" (win now if possible, else block the
+opponent's immediate win, else random).
+"""
+import numpy as np
+
+BATCH_POLICIES = ("random", "tactical")
+
+
+def _has_line(mask, shifts):
+    # Teste de quatro em linha (shift-and-mask) em todos os jogos do lote
+    found = np.zeros(mask.shape, dtype=bool)
+    for shift in shifts:
+        pair = mask & (mask >> shift)
+        found |= (pair & (pair >> (shift * np.uint64(2)))) != 0
+    return found
+
+
+def _winning_cells(own, shifts):
+    # Células (vazias ou não) que completam quatro em linha para `own`:
+    # vertical, depois as três posições possíveis da peça que falta
+    one, two, three = np.uint64(1), np.uint64(2), np.uint64(3)
+    cells = (own << one) & (own << two) & (own << three)
+    for shift in shifts[1:]:
+        pair = (own << shift) & (own << two * shift)
+        cells |= pair & (own << three * shift)
+        cells |= pair & (own >> shift)
+        pair = (own >> shift) & (own >> two * shift)
+        cells |= pair & (own << shift)
+        cells |= pair & (own >> three * shift)
+    return cells
+
+
+def _columns_with(cells, column_shifts, column_bits):
+    # (jogos, colunas) bool: colunas com pelo menos uma das `cells`
+    return ((cells[:, None] >> column_shifts) & column_bits) != 0
+
+
+def simulate(game, num_games, policy="random", rng=None):
+    """Plays ``num_games`` games to the end from ``game`` (left untouched).
+
+    Returns an int8 array with the winner of each game (1 or 2, 0 for a
+    tie). ``rng`` is a ``numpy.random.Generator``.
+    """
+    if policy not in BATCH_POLICIES:
+        raise ValueError(f"batch rollouts support {BATCH_POLICIES}, got {policy!r}")
+    if rng is None:
+        rng = np.random.default_rng()
+    winners = np.full(num_games, game.winner, dtype=np.int8)
+    if game.is_terminal():
+        return winners
+
+    rows, cols = game.rows, game.cols
+    h1 = rows + 1
+    shifts = tuple(np.uint64(s) for s in (1, h1, h1 - 1, h1 + 1))
+    column_shifts = (np.arange(cols) * h1).astype(np.uint64)
+    column_bits = np.uint64((1 << rows) - 1)
+    bottom = np.uint64(game._bottom)
+    board_mask = np.uint64(game._bottom * ((1 << rows) - 1))
+
+    index = np.arange(num_games)  # Jogos ainda a decorrer
+    masks = np.empty((2, num_games), dtype=np.uint64)
+    masks[0], masks[1] = game.masks[0], game.masks[1]
+    heights = np.tile(np.array(game.heights, dtype=np.int64), (num_games, 1))
+    player = game.current_player
+
+    for _ in range(rows * cols - game.move_count):
+        own, other = masks[player - 1], masks[2 - player]
+        choices = heights < rows
+        if policy == "tactical":
+            # Ganhar já tem prioridade sobre bloquear o adversário
+            playable = ((own | other) + bottom) & board_mask
+            decided = np.zeros(len(index), dtype=bool)
+            for cells in (_winning_cells(own, shifts), _winning_cells(other, shifts)):
+                threats = _columns_with(cells & playable, column_shifts, column_bits)
+                use = threats.any(axis=1) & ~decided
+                choices[use] = threats[use]
+                decided |= use
+        # Coluna uniforme entre as escolhidas: maior número aleatório nelas
+        column = np.argmax(rng.random(choices.shape) * choices, axis=1)
+        games = np.arange(len(index))
+        bit = np.uint64(1) << (column * h1 + heights[games, column]).astype(np.uint64)
+        heights[games, column] += 1
+        masks[player - 1] |= bit
+
+        won = _has_line(masks[player - 1], shifts)
+        if won.any():
+            winners[index[won]] = player
+            keep = ~won
+            index, masks, heights = index[keep], masks[:, keep], heights[keep]
+            if not len(index):
+                break
+        player = 3 - player
+
+    return winners  # Os que chegaram ao tabuleiro cheio ficam com 0 (empate)
@@ -0,0 +1,228 @@
+"""Micro-benchmarks for the game engine and the search code.
+
+Usage: python benchmark.py [nome ...]  (sem argumentos corre todos)
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from batch_rollout import simulate
+from connect_four import ConnectFour, NumpyConnectFour, score_boards
+from mcts import MCTS, MCTSSession
+from negamax import AlphaBeta
+from rollout_policies import ROLLOUT_POLICIES
+
+
+def _random_playouts(game_class, num_games):
+    """Plays random games the way Node.rollout does and returns the elapsed time."""
+    random.seed(0)
+    start = time.perf_counter()
+    for _ in range(num_games):
+        game = game_class().copy()
+        while not game.check_win(1) and not game.check_win(2) and not game.is_tie():
+            move = random.choice(game.get_valid_locations())
+            game.drop_piece(move, game.get_current_player())
+            game.switch_player()
+    return time.perf_counter() - start
+
+
+def _mcts_iterations(game_class, iterations):
+    random.seed(0)
+    start = time.perf_counter()
+    mcts = MCTS(game_class(), iterations=iterations)
+    mcts.run()
+    return time.perf_counter() - start
+
+
+def bench_board(num_games=300, iterations=400):
+    """Bitboard ConnectFour vs the NumPy reference board."""
+    print("== Tabuleiro: bitboard vs NumPy ==")
+    t_numpy = _random_playouts(NumpyConnectFour, num_games)
+    t_bits = _random_playouts(ConnectFour, num_games)
+    print(f"Jogos aleatórios ({num_games}): NumPy {t_numpy:.3f} s | "
+          f"bitboard {t_bits:.3f} s | speedup {t_numpy / t_bits:.1f}x")
+
+    t_numpy = _mcts_iterations(NumpyConnectFour, iterations)
+    t_bits = _mcts_iterations(ConnectFour, iterations)
+    print(f"MCTS ({iterations} iterações): NumPy {t_numpy:.3f} s | "
+          f"bitboard {t_bits:.3f} s | speedup {t_numpy / t_bits:.1f}x")
+
+
+def bench_score(num_boards=2000):
+    """score_position: NumPy reference vs bitboard vs batched score_boards."""
+    print("== score_position ==")
+    random.seed(0)
+    games = []
+    for _ in range(num_boards):
+        game = ConnectFour()
+        for _ in range(random.randint(0, 30)):
+            if game.is_terminal():
+                break
+            game.drop_piece(random.choice(game.get_valid_locations()), game.current_player)
+            game.switch_player()
+        games.append(game)
+    boards = np.array([game.get_board() for game in games])
+
+    reference = NumpyConnectFour()
+    start = time.perf_counter()
+    for board in boards:
+        reference.board = board
+        reference.score_position(1)
+    t_numpy = time.perf_counter() - start
+    start = time.perf_counter()
+    for game in games:
+        game.score_position(1)
+    t_bits = time.perf_counter() - start
+    start = time.perf_counter()
+    score_boards(boards, 1)
+    t_batch = time.perf_counter() - start
+    print(f"{num_boards} tabuleiros: NumPy {t_numpy:.3f} s | bitboard {t_bits:.3f} s "
+          f"({t_numpy / t_bits:.0f}x) | lote {t_batch:.4f} s ({t_numpy / t_batch:.0f}x)")
+
+
+def bench_tree(iterations=20000):
+    """Tree size and speed of a long search on the empty board."""
+    print("== Árvore MCTS (NodePool) ==")
+    random.seed(0)
+    mcts = MCTS(ConnectFour(), iterations=iterations)
+    start = time.perf_counter()
+    mcts.run()
+    elapsed = time.perf_counter() - start
+    print(f"{iterations} iterações em {elapsed:.2f} s ({iterations / elapsed:.0f} it/s) | "
+          f"{len(mcts.pool)} nós | {mcts.pool.nbytes() / 2**20:.1f} MiB")
+
+
+def bench_transpositions(iterations=20000):
+    """Search without, with the transposition table and with mirror symmetry."""
+    print("== Tabela de transposições ==")
+    for name, options in (("sem tabela", {}), ("transpositions", {"transpositions": True}),
+                          ("symmetry", {"symmetry": True})):
+        random.seed(0)
+        mcts = MCTS(ConnectFour(), iterations=iterations, **options)
+        start = time.perf_counter()
+        mcts.run()
+        elapsed = time.perf_counter() - start
+        line = f"{name}: {iterations / elapsed:.0f} it/s | {len(mcts.pool)} nós"
+        if mcts.tt is not None:
+            line += (f" | {len(mcts.tt)} posições | hit rate {mcts.tt.hit_rate():.1%}"
+                     f" | {mcts.tt.evictions} despejos")
+        print(line)
+
+
+def _bench_parallel(parallel, iterations):
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        random.seed(0)
+        mcts = MCTS(ConnectFour(), iterations=iterations, workers=workers, parallel=parallel)
+        mcts.run()  # Aquece o pool de processos
+        start = time.perf_counter()
+        mcts.run()
+        elapsed = time.perf_counter() - start
+        print(f"{workers} processo(s): {iterations / elapsed:.0f} it/s | {len(mcts.pool)} nós")
+        workers *= 2
+
+
+def bench_root_parallel(iterations=20000):
+    """Iterations per second of the root-parallel search for 1..N workers."""
+    print("== MCTS paralelo na raiz ==")
+    _bench_parallel("root", iterations)
+
+
+def bench_tree_parallel(iterations=20000):
+    """Iterations per second of the shared-tree search for 1..N workers."""
+    print("== MCTS paralelo na árvore (perda virtual) ==")
+    _bench_parallel("tree", iterations)
+
+
+def bench_batch_rollouts(num_games=2000, batch_sizes=(64, 1024, 16384)):
+    """Random playouts per second: one game at a time vs the batch simulator."""
+    print("== Simulações em lote ==")
+    elapsed = _random_playouts(ConnectFour, num_games)
+    print(f"Uma a uma: {num_games / elapsed:.0f} jogos/s")
+    rng = np.random.default_rng(0)
+    for size in batch_sizes:
+        start = time.perf_counter()
+        simulate(ConnectFour(), size, rng=rng)
+        elapsed = time.perf_counter() - start
+        print(f"Lote de {size}: {size / elapsed:.0f} jogos/s")
+
+
+def _play_match(policy, baseline, games, move_ms):
+    """Pontos de `policy` (vitória 1, empate 0.5) contra `baseline`, com o
+    mesmo tempo por jogada e alternando quem começa."""
+    points = 0.0
+    for i in range(games):
+        random.seed(i)
+        seat = 1 if i % 2 == 0 else 2  # Jogador que usa `policy`
+        players = {seat: policy, 3 - seat: baseline}
+        game = ConnectFour()
+        while not game.is_terminal():
+            mcts = MCTS(game, rollout_policy=players[game.current_player])
+            mcts.run(time_limit_ms=move_ms)
+            game.drop_piece(mcts.get_best_move(), game.current_player)
+            game.switch_player()
+        if game.winner == 0:
+            points += 0.5
+        elif game.winner == seat:
+            points += 1
+    return points
+
+
+def bench_rollouts(iterations=3000, games=10, move_ms=100):
+    """Speed of each rollout policy and its strength at equal CPU time per move."""
+    print("== Políticas de simulação ==")
+    for name in ROLLOUT_POLICIES:
+        random.seed(0)
+        mcts = MCTS(ConnectFour(), iterations=iterations, rollout_policy=name)
+        start = time.process_time()
+        mcts.run()
+        cpu = time.process_time() - start
+        points = _play_match(name, "random", games, move_ms)
+        print(f"{name}: {iterations / cpu:.0f} it/s de CPU | {move_ms} ms por jogada contra "
+              f"random: {points:g}/{games} pontos")
+
+
+def bench_alphabeta(move_ms=200, games=4, iterations=400):
+    """Alpha-beta depth reached per move and results against MCTS."""
+    print("== Alpha-beta (negamax) ==")
+    engine = AlphaBeta(time_limit_ms=move_ms)
+    start = time.perf_counter()
+    engine.search(ConnectFour())
+    elapsed = time.perf_counter() - start
+    print(f"Tabuleiro vazio em {move_ms} ms: profundidade {engine.depth} | "
+          f"{engine.nodes / elapsed:.0f} nós/s")
+    points = 0.0
+    for i in range(games):
+        random.seed(i)
+        seat = 1 if i % 2 == 0 else 2  # Jogador do alpha-beta
+        engine = AlphaBeta(time_limit_ms=move_ms)
+        session = MCTSSession(iterations=iterations)
+        game = ConnectFour()
+        while not game.is_terminal():
+            player = engine if game.current_player == seat else session
+            game.drop_piece(player.search(game), game.current_player)
+            game.switch_player()
+        points += 1 if game.winner == seat else 0.5 if game.winner == 0 else 0
+    print(f"Contra MCTS ({iterations} iterações): {points:g}/{games} pontos")
+
+
+BENCHMARKS = {
+    "board": bench_board,
+    "score": bench_score,
+    "tree": bench_tree,
+    "transpositions": bench_transpositions,
+    "rollouts": bench_rollouts,
+    "batch_rollouts": bench_batch_rollouts,
+    "alphabeta": bench_alphabeta,
+    "root_parallel": bench_root_parallel,
+    "tree_parallel": bench_tree_parallel,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -5,10 +5,370 @@ from ID3_MCTS import DecisionTree
 # Depois cria e treina a árvore lá, ou importa o objeto já treinado
 
 class ConnectFour:
+    """Connect Four game state stored as bitboards.
+
+    Each player owns an integer mask with one bit per cell. Cells are laid
+    out column by column, ``rows + 1`` bits per column (the extra bit is an
+    always-empty sentinel so shifted lines never wrap into the next column):
+
+        bit = column * (rows + 1) + row
+
+    ``heights`` keeps the number of pieces in each column, so dropping a
+    piece and copying the state never touch a full board. The tuple of
+    playable columns is cached and only rebuilt when a column fills up.
+
+    ``drop_piece`` records the last move and updates ``winner`` (0 while
+    nobody has four in a row), so terminal checks are a couple of attribute
+    reads instead of a board scan. Every move is pushed onto ``history`` and
+    can be taken back with ``undo_move``, so search code can play and unmake
+    moves on a single game instead of copying it.
+
+    Every window of ``winning_length`` cells is also kept as a bit mask
+    (``_windows``, and per cell in ``_cell_windows``), so ``score_position``
+    counts pieces with popcounts and ``score_move`` only looks at the
+    windows through the cell a move would fill.
+    """
+
+    def __init__(self, rows=6, cols=7):
+        self.rows = rows
+        self.cols = cols
+        self.masks = [0, 0]  # masks[player - 1]
+        self.heights = [0] * cols
+        self._valid_moves = tuple(range(cols))
+        self.move_count = 0
+        self.history = []  # columns played, oldest first
+        self.last_move = None
+        self.winner = 0
+        self.current_player = 1  # Player 1 starts
+        self.winning_length = 4  # Number of pieces in a row needed to win
+
+        h1 = rows + 1
+        # Shifts for vertical, horizontal and both diagonal directions
+        self._directions = (1, h1, h1 - 1, h1 + 1)
+        self._bottom = sum(1 << (c * h1) for c in range(cols))
+        self._build_windows()
+
+    def _build_windows(self):
+        """Window masks and the ``evaluate_window`` score of every piece count."""
+        h1 = self.rows + 1
+        length = self.winning_length
+        self._windows = []
+        self._cell_windows = [[] for _ in range(self.cols * h1)]
+        for c in range(self.cols):
+            for r in range(self.rows):
+                for dc, dr in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                    end_c, end_r = c + dc * (length - 1), r + dr * (length - 1)
+                    if not (end_c < self.cols and 0 <= end_r < self.rows):
+                        continue
+                    bits = [(c + dc * i) * h1 + r + dr * i for i in range(length)]
+                    window = sum(1 << bit for bit in bits)
+                    self._windows.append(window)
+                    for bit in bits:
+                        self._cell_windows[bit].append(window)
+        self._center = sum(1 << (self.cols // 2 * h1 + r) for r in range(self.rows))
+
+        # _window_scores[own][opponent]: evaluate_window of a window with those
+        # counts; _move_scores[own][opponent]: gain of adding one own piece
+        self._window_scores = [
+            [self.evaluate_window([1] * own + [2] * opp + [0] * (length - own - opp), 1)
+             if own + opp <= length else 0 for opp in range(length + 1)]
+            for own in range(length + 1)
+        ]
+        self._move_scores = [
+            [self._window_scores[own + 1][opp] - self._window_scores[own][opp] for opp in range(length + 1)]
+            for own in range(length)
+        ]
+
+    @property
+    def board(self):
+        return self.get_board()
+
+    def get_board(self):
+        """Returns the board as a (rows, cols) NumPy array, row 0 at the bottom."""
+        board = np.zeros((self.rows, self.cols), dtype=int)
+        p1 = self.masks[0]
+        h1 = self.rows + 1
+        for c in range(self.cols):
+            for r in range(self.heights[c]):
+                board[r][c] = 1 if (p1 >> (c * h1 + r)) & 1 else 2
+        return board
+
+    def drop_piece(self, column, player):
+        """Drops a piece into the specified column for the given player."""
+        if self.is_valid_location(column):
+            row = self.heights[column]
+            mask = self.masks[player - 1] | 1 << (column * (self.rows + 1) + row)
+            self.masks[player - 1] = mask
+            self.heights[column] = row + 1
+            if row + 1 == self.rows:
+                self._valid_moves = tuple(c for c in self._valid_moves if c != column)
+            self.move_count += 1
+            self.history.append(column)
+            self.last_move = column
+            # Only the player who just moved can have completed a new line,
+            # and any such line goes through the piece just dropped.
+            if not self.winner and self._has_line(mask):
+                self.winner = player
+            return True  # Indicate successful move
+        else:
+            return False  # Indicate invalid move
+
+    def undo_move(self, column):
+        """Takes back the last move, which must have been played in ``column``.
+
+        Restores the board, the legal moves and the winner exactly as they
+        were before that move. ``current_player`` is left alone, mirroring
+        ``drop_piece``.
+        """
+        if not self.history or self.history[-1] != column:
+            return False  # Indicate invalid undo
+        row = self.heights[column] - 1
+        bit = 1 << (column * (self.rows + 1) + row)
+        index = 0 if self.masks[0] & bit else 1
+        mask = self.masks[index] & ~bit
+        self.masks[index] = mask
+        self.heights[column] = row
+        if row + 1 == self.rows:
+            self._valid_moves = tuple(c for c in range(self.cols) if self.heights[c] < self.rows)
+        self.move_count -= 1
+        self.history.pop()
+        self.last_move = self.history[-1] if self.history else None
+        if self.winner == index + 1 and not self._has_line(mask):
+            self.winner = 0
+        return True
+
+    def is_valid_location(self, column):
+        """Checks if the specified column is a valid location to drop a piece."""
+        return 0 <= column < self.cols and self.heights[column] < self.rows
+
+    def get_next_open_row(self, column):
+        """Gets the next open row in the specified column."""
+        if self.heights[column] < self.rows:
+            return self.heights[column]
+
+    def _has_line(self, mask):
+        """Shift-and-mask test for ``winning_length`` aligned bits in ``mask``."""
+        for shift in self._directions:
+            line = mask
+            for _ in range(self.winning_length - 1):
+                line &= line >> shift
+            if line:
+                return True
+        return False
+
+    def key(self):
+        """Unique integer key of the position (pieces and player to move).
+
+        ``masks[0] + occupied + bottom`` sets, in each column, one bit just
+        above the pieces, which encodes the column height, and keeps player 1's
+        pieces below it. The player to move goes in the bit after the board.
+        """
+        p1 = self.masks[0]
+        key = p1 + (p1 | self.masks[1]) + self._bottom
+        return key | (self.current_player - 1) << (self.cols * (self.rows + 1))
+
+    def canonical_key(self):
+        """Mirror-normalized key: ``(key, mirrored)``.
+
+        ``key`` is the smaller of ``key()`` and the key of the horizontally
+        mirrored position, so both orientations of a position share it;
+        ``mirrored`` tells whether it came from the mirrored one (moves in
+        that frame map back with ``mirror_move``).
+        """
+        key = self.key()
+        h1 = self.rows + 1
+        column = (1 << h1) - 1
+        mirrored = key >> (self.cols * h1) << (self.cols * h1)  # player to move
+        for c in range(self.cols):
+            mirrored |= ((key >> (c * h1)) & column) << ((self.cols - 1 - c) * h1)
+        if mirrored < key:
+            return mirrored, True
+        return key, False
+
+    def mirror_move(self, column):
+        """Column that corresponds to ``column`` on the mirrored board."""
+        return self.cols - 1 - column
+
+    def check_win(self, player):
+        """Checks if the specified player has won the game."""
+        return self._has_line(self.masks[player - 1])
+
+    def is_tie(self):
+        """Checks if the game is a tie."""
+        return self.move_count == self.rows * self.cols
+
+    def is_terminal(self):
+        """Checks if the game is over (someone won or the board is full)."""
+        return self.winner != 0 or self.move_count == self.rows * self.cols
+
+    def get_valid_locations(self):
+        """Returns the (cached, read-only) tuple of valid columns to drop a piece."""
+        return self._valid_moves
+
+    def switch_player(self):
+        """Switches the current player."""
+        self.current_player = 3 - self.current_player  # Toggle between 1 and 2
+
+    def get_current_player(self):
+        return self.current_player
+
+    def copy(self):
+        """Creates a copy of the game state (a few ints and two short lists)."""
+        new_game = ConnectFour.__new__(ConnectFour)
+        new_game.rows = self.rows
+        new_game.cols = self.cols
+        new_game.masks = self.masks[:]
+        new_game.heights = self.heights[:]
+        new_game._valid_moves = self._valid_moves
+        new_game.move_count = self.move_count
+        new_game.history = self.history[:]
+        new_game.last_move = self.last_move
+        new_game.winner = self.winner
+        new_game.current_player = self.current_player
+        new_game.winning_length = self.winning_length
+        new_game._directions = self._directions
+        new_game._bottom = self._bottom
+        new_game._windows = self._windows
+        new_game._cell_windows = self._cell_windows
+        new_game._center = self._center
+        new_game._window_scores = self._window_scores
+        new_game._move_scores = self._move_scores
+        return new_game
+
+    def print_board(self):
+        """Prints the board to the console (for debugging)."""
+        print(np.flip(self.get_board(), 0))
+
+    def evaluate_window(self, window, player):
+        """Evaluates a window of 4 for the given player."""
+        score = 0
+        opponent = 3 - player
+
+        if window.count(player) == 4:
+            score += 100
+        elif window.count(player) == 3 and window.count(0) == 1:
+            score += 5
+        elif window.count(player) == 2 and window.count(0) == 2:
+            score += 2
+
+        if window.count(opponent) == 3 and window.count(0) == 1:
+            score -= 4
+
+        return score
+
+    def score_position(self, player):
+        """Scores the board for the given player.
+
+        Same score as summing ``evaluate_window`` over every window plus 3 per
+        own piece in the center column, computed with popcounts on the masks.
+        """
+        own = self.masks[player - 1]
+        opp = self.masks[2 - player]
+        scores = self._window_scores
+        score = (own & self._center).bit_count() * 3
+        for window in self._windows:
+            score += scores[(window & own).bit_count()][(window & opp).bit_count()]
+        return score
+
+    def score_move(self, column, player=None):
+        """Change in ``score_position(player)`` if ``player`` drops in ``column``.
+
+        Only the windows through the cell that would be filled are looked at.
+        ``player`` defaults to the player to move; ``column`` must be valid.
+        """
+        if player is None:
+            player = self.current_player
+        own = self.masks[player - 1]
+        opp = self.masks[2 - player]
+        bit = column * (self.rows + 1) + self.heights[column]
+        scores = self._move_scores
+        score = 3 if column == self.cols // 2 else 0
+        for window in self._cell_windows[bit]:
+            score += scores[(window & own).bit_count()][(window & opp).bit_count()]
+        return score
+
+    def winning_moves(self, player=None):
+        """Columns where ``player`` (default: the player to move) wins at once."""
+        if player is None:
+            player = self.current_player
+        h1 = self.rows + 1
+        own = self.masks[player - 1]
+        occupied = self.masks[0] | self.masks[1]
+        # Empty cells that complete four in a row: vertical, then for each
+        # other direction the three places the missing piece can be in
+        cells = (own << 1) & (own << 2) & (own << 3)
+        for shift in self._directions[1:]:
+            pair = (own << shift) & (own << 2 * shift)
+            cells |= pair & (own << 3 * shift)
+            cells |= pair & (own >> shift)
+            pair = (own >> shift) & (own >> 2 * shift)
+            cells |= pair & (own << shift)
+            cells |= pair & (own >> 3 * shift)
+        # Only cells at the top of a column can be played right now
+        playable = (occupied + self._bottom) & (self._bottom * ((1 << self.rows) - 1))
+        cells &= playable
+        if not cells:
+            return []
+        column_bits = (1 << h1) - 1
+        return [c for c in self._valid_moves if (cells >> (c * h1)) & column_bits]
+
+
+_window_tables_cache = {}
+
+
+def window_tables(rows=6, cols=7):
+    """Window index table and window score table for ``score_boards``.
+
+    Returns ``(index, scores)``: ``index`` is a ``(windows, 4)`` array of
+    flat cell indices into a row-major ``(rows, cols)`` board (69 windows on
+    the standard board, same windows as ``ConnectFour._windows``), and
+    ``scores[own, opponent]`` is the ``evaluate_window`` score of a window
+    with those piece counts. Built once per board size.
+    """
+    if (rows, cols) not in _window_tables_cache:
+        game = ConnectFour(rows, cols)
+        h1 = rows + 1
+        index = np.array([
+            [(bit % h1) * cols + bit // h1 for bit in range(cols * h1) if window >> bit & 1]
+            for window in game._windows
+        ])
+        _window_tables_cache[rows, cols] = (index, np.array(game._window_scores))
+    return _window_tables_cache[rows, cols]
+
+
+def score_boards(boards, player):
+    """``score_position`` of a board or a batch of boards, vectorized.
+
+    ``boards`` is a ``(rows, cols)`` array or a ``(n, rows, cols)`` batch (row 0
+    at the bottom, as ``get_board`` returns it); ``player`` is a player number
+    or one per board. Returns an int, or an array with one score per board.
+    """
+    boards = np.asarray(boards)
+    single = boards.ndim == 2
+    if single:
+        boards = boards[None]
+    n, rows, cols = boards.shape
+    index, scores = window_tables(rows, cols)
+    player = np.asarray(player).reshape(-1, 1)
+    cells = boards.reshape(n, -1)[:, index]  # (n, windows, 4)
+    own = (cells == player[:, :, None]).sum(axis=2)
+    opponent = (cells == 3 - player[:, :, None]).sum(axis=2)
+    score = scores[own, opponent].sum(axis=1) + 3 * (boards[:, :, cols // 2] == player).sum(axis=1)
+    return int(score[0]) if single else score
+
+
+class NumpyConnectFour:
+    """Original Connect Four state on a (rows, cols) NumPy array.
+
+    Kept as the reference implementation: ``benchmark.py`` measures the
+    bitboard engine against it and it is handy for cross-checking results.
+    """
+
     def __init__(self, rows=6, cols=7):
         self.rows = rows
         self.cols = cols
         self.board = np.zeros((rows, cols), dtype=int)
+        self.history = []  # columns played, oldest first
         self.current_player = 1  # Player 1 starts
         self.winning_length = 4  # Number of pieces in a row needed to win
 
@@ -20,10 +380,24 @@ class ConnectFour:
         if self.is_valid_location(column):
             row = self.get_next_open_row(column)
             self.board[row][column] = player
+            self.history.append(column)
             return True  # Indicate successful move
         else:
             return False  # Indicate invalid move
 
+    def undo_move(self, column):
+        """Takes back the last move, which must have been played in ``column``."""
+        if not self.history or self.history[-1] != column:
+            return False  # Indicate invalid undo
+        row = self.rows - 1 if self.board[self.rows - 1][column] != 0 else self.get_next_open_row(column) - 1
+        self.board[row][column] = 0
+        self.history.pop()
+        return True
+
+    @property
+    def move_count(self):
+        return len(self.history)
+
     def is_valid_location(self, column):
         """Checks if the specified column is a valid location to drop a piece."""
         return 0 <= column < self.cols and self.board[self.rows - 1][column] == 0
@@ -34,6 +408,24 @@ class ConnectFour:
             if self.board[r][column] == 0:
                 return r
 
+    def key(self):
+        """Same key as ``ConnectFour.key()``, built from the board array.
+
+        Cells map to bits as in the bitboards (``column * (rows + 1) + row``).
+        """
+        h1 = self.rows + 1
+        p1 = occupied = bottom = 0
+        for c in range(self.cols):
+            bottom |= 1 << (c * h1)
+            for r in range(self.rows):
+                if self.board[r][c]:
+                    bit = 1 << (c * h1 + r)
+                    occupied |= bit
+                    if self.board[r][c] == 1:
+                        p1 |= bit
+        key = p1 + occupied + bottom
+        return key | (self.current_player - 1) << (self.cols * h1)
+
     def check_win(self, player):
         """Checks if the specified player has won the game."""
         # Check horizontal
@@ -66,6 +458,19 @@ class ConnectFour:
         """Checks if the game is a tie."""
         return all(self.board[self.rows - 1][c] != 0 for c in range(self.cols))
 
+    @property
+    def winner(self):
+        """Player with four in a row, 0 if none (full board scan)."""
+        if self.check_win(1):
+            return 1
+        if self.check_win(2):
+            return 2
+        return 0
+
+    def is_terminal(self):
+        """Checks if the game is over (someone won or the board is full)."""
+        return self.winner != 0 or self.is_tie()
+
     def get_valid_locations(self):
         """Returns a list of valid column indices to drop a piece."""
         return [c for c in range(self.cols) if self.is_valid_location(c)]
@@ -79,8 +484,9 @@ class ConnectFour:
 
     def copy(self):
         """Creates a deep copy of the game state."""
-        new_game = ConnectFour(self.rows, self.cols)
+        new_game = NumpyConnectFour(self.rows, self.cols)
         new_game.board = np.copy(self.board)
+        new_game.history = self.history[:]
         new_game.current_player = self.current_player
         return new_game
 
@@ -140,4 +546,4 @@ class ConnectFour:
                 window = [self.board[r + 3 - i][c + i] for i in range(4)]
                 score += self.evaluate_window(window, player)
     
-        return score
\ No newline at end of file
+        return score
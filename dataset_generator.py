@@ -1,60 +1,207 @@
-from mcts import MCTS
-from connect_four import ConnectFour
-import pandas as pd
+"""Gera o dataset de treino do ID3: posições aleatórias e a jogada do MCTS.
+
+Uso: python dataset_generator.py [--samples N] [--workers W] [--shards S] [--csv F] [--book F]
+
+O trabalho é dividido em shards, cada um gerado por um processo do pool com
+a sua semente. Cada shard é escrito linha a linha em shards/shard_XXXX.c4
+(formato binário do dataset_store, com a coluna `sample`, o índice da
+amostra no shard), por isso uma geração interrompida retoma onde ficou se
+for corrida outra vez com os mesmos argumentos. Cada shard pesquisa cada
+posição (canónica) uma só vez e guarda, além da jogada, as visitas da raiz
+por coluna. No fim os shards são juntos em connect4_mcts_dataset.c4, uma
+linha por posição com as visitas somadas entre shards (e, com --csv,
+exportados também para CSV).
+"""
+import argparse
+import glob
+import multiprocessing
+import os
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 from tqdm import tqdm  # Importação do tqdm
 
-dataset = []
+from connect_four import ConnectFour
+from dataset_store import (COLUMNS, VISIT_COLUMNS, DatasetWriter, export_csv, feature_columns,
+                           column_view, open_dataset, write_dataset)
+from mcts import MCTS
+from opening_book import OpeningBook
+from symmetry import canonical_features
+
+DEFAULT_DATASET = 'connect4_mcts_dataset.c4'
+_progress = None  # Contador partilhado de amostras tratadas (em cada processo)
+
 
-num_samples = 15000  # número de exemplos
+def _init_worker(progress):
+    global _progress
+    _progress = progress
 
-for _ in tqdm(range(num_samples), desc="Gerando exemplos"):
+
+def _random_position(rng):
     game = ConnectFour()
-    num_moves = random.randint(0, 20)
-    for _ in range(num_moves):
+    for _ in range(rng.randint(0, 20)):
         valid_moves = game.get_valid_locations()
         if not valid_moves:
             break
-        move = random.choice(valid_moves)
+        move = rng.choice(valid_moves)
         game.drop_piece(move, game.get_current_player())
         game.switch_player()
-    
-    # Ignora estados terminais
-    if game.check_win(1) or game.check_win(2) or game.is_tie():
-        continue
-
-    # Executa o MCTS para estados não terminais
-    mcts = MCTS(game, iterations=1000)
-    mcts.run()
-    best_move = mcts.get_best_move()
-
-    # Verifica se o MCTS encontrou um movimento válido
-    if best_move is None:
-        continue
-
-    # Cria o exemplo para o dataset
-    estado = []
-    for row in game.board:
-        estado.extend(row)
-    exemplo = {f'cell_{i}': valor for i, valor in enumerate(estado)}
-    exemplo['player'] = game.get_current_player()
-    exemplo['move'] = best_move
-    dataset.append(exemplo)
-
-    # Inclui estados terminais no dataset
-    if game.check_win(1) or game.check_win(2) or game.is_tie():
-        estado = []
-        for row in game.board:
-            estado.extend(row)
-        exemplo = {f'cell_{i}': valor for i, valor in enumerate(estado)}
-        exemplo['player'] = game.get_current_player()
-        exemplo['move'] = None  # Sem movimento válido
-        dataset.append(exemplo)
-
-# Verifica se o dataset contém exemplos antes de salvar
-if len(dataset) == 0:
-    print("Erro: Nenhum exemplo foi gerado. O dataset está vazio.")
-else:
-    df = pd.DataFrame(dataset)
-    df.to_csv('connect4_mcts_dataset.csv', index=False)
-    print(f"Dataset gerado com sucesso! Total de exemplos: {len(dataset)}")
+    return game
+
+
+SHARD_COLUMNS = COLUMNS + VISIT_COLUMNS + ['sample']
+
+
+def _read_shard(path):
+    # Posições canónicas já no shard e índice da última amostra (o
+    # DatasetWriter descarta uma última linha escrita a meio)
+    if not os.path.exists(path):
+        return set(), -1
+    rows, header = open_dataset(path)
+    features = [SHARD_COLUMNS[i] for i in feature_columns(SHARD_COLUMNS)]
+    vistos = {row.tobytes() for row in np.asarray(column_view(rows, header, features), dtype=np.int8)}
+    return vistos, int(column_view(rows, header, ['sample'])[-1, 0]) if len(rows) else -1
+
+
+def generate_shard(path, num_samples, seed, iterations=1000, book_path=None):
+    """Gera (ou termina) um shard e devolve o número de linhas que ele tem.
+
+    Com `book_path` as pesquisas partem das estatísticas do livro de
+    aberturas; as visitas guardadas são só as da pesquisa feita aqui.
+    """
+    book = OpeningBook.load(book_path) if book_path else None
+    # Cache das posições já pesquisadas neste shard (chave: posição
+    # canónica): uma posição repetida não volta a ser pesquisada
+    vistos, last = _read_shard(path)
+    if _progress is not None:
+        with _progress.get_lock():
+            _progress.value += last + 1
+
+    # Posição e jogada em int8; visitas e `sample` num bloco int32
+    with DatasetWriter(path, SHARD_COLUMNS, canonical=True) as writer:
+        for sample in range(last + 1, num_samples):
+            # Cada amostra tem a sua semente: retomar gera as mesmas posições
+            rng = random.Random(f"{seed}:{sample}")
+            random.seed(rng.getrandbits(64))  # Usado pelo MCTS
+            game = _random_position(rng)
+            if _progress is not None:
+                with _progress.get_lock():
+                    _progress.value += 1
+
+            # Ignora estados terminais
+            if game.is_terminal():
+                continue
+
+            # Uma posição (ou o seu espelho) já analisada não é repetida
+            estado = [int(v) for v in game.get_board().ravel()] + [game.get_current_player()]
+            X, _, mirrored = canonical_features([estado])
+            chave = X[0].astype(np.int8).tobytes()
+            if chave in vistos:
+                continue
+            vistos.add(chave)
+
+            # Executa o MCTS para estados não terminais
+            mcts = MCTS(game, iterations=iterations, symmetry=True, book=book)
+            mcts.consult_book()
+            do_livro = dict((move, visits) for move, visits, _ in mcts.root_statistics())
+            mcts.run()
+            best_move = mcts.get_best_move()
+            if best_move is None:
+                continue
+
+            # Guarda a posição na orientação canónica (a jogada e as visitas
+            # por coluna, sem as que vieram do livro, são espelhadas com ela)
+            visitas = np.zeros(game.cols, dtype=np.int64)
+            for move, visits, _ in mcts.root_statistics():
+                visitas[move] = visits - do_livro.get(move, 0)
+            if mirrored[0]:
+                best_move = game.mirror_move(best_move)
+                visitas = visitas[::-1]
+            writer.append(list(X[0]) + [best_move] + list(visitas) + [sample])
+        return writer.rows
+
+
+def merge_shards(shard_dir, output=DEFAULT_DATASET, csv_output=None):
+    """Junta os shards num só dataset, uma linha por posição.
+
+    Uma posição pesquisada em vários shards fica com as visitas da raiz
+    somadas (colunas visits_*, a distribuição das jogadas) e com a jogada
+    mais visitada nessa soma como `move`. O dataset é escrito no formato
+    binário (dataset_store) e, se `csv_output` for dado, também em CSV.
+    """
+    paths = sorted(glob.glob(os.path.join(shard_dir, 'shard_*.c4')))
+    columns = COLUMNS + VISIT_COLUMNS
+    rows = np.concatenate([column_view(*open_dataset(path), columns) for path in paths]) if paths else \
+        np.empty((0, len(columns)), dtype=np.int32)
+    features = feature_columns(columns)
+    move = columns.index('move')
+    visits = [columns.index(name) for name in VISIT_COLUMNS]
+
+    # Primeira ocorrência de cada posição, pela ordem dos shards
+    _, first, group = np.unique(rows[:, features], axis=0, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    pooled = np.zeros((len(first), len(visits)), dtype=np.int64)
+    np.add.at(pooled, group.ravel(), rows[:, visits])
+    merged = rows[first[order]]
+    merged[:, visits] = pooled[order]
+    repeated = np.bincount(group.ravel(), minlength=len(first))[order] > 1
+    merged[repeated, move] = np.argmax(pooled[order][repeated], axis=1)
+
+    write_dataset(output, merged, columns, canonical=True)
+    if csv_output:
+        export_csv(output, csv_output)
+    return len(merged)
+
+
+def generate(num_samples=15000, workers=None, shards=None, shard_dir='shards', seed=0,
+             iterations=1000, output=DEFAULT_DATASET, csv_output=None, book_path=None):
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers * 4
+    os.makedirs(shard_dir, exist_ok=True)
+    share, extra = divmod(num_samples, shards)
+    progress = multiprocessing.Value('q', 0)
+    start = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(progress,)) as executor:
+        futures = [
+            executor.submit(generate_shard, os.path.join(shard_dir, f'shard_{i:04d}.c4'),
+                            share + (i < extra), f"{seed}:{i}", iterations, book_path)
+            for i in range(shards)
+        ]
+        with tqdm(total=num_samples, desc="Gerando exemplos") as bar:
+            while not all(future.done() for future in futures):
+                time.sleep(0.5)
+                bar.update(progress.value - bar.n)
+                elapsed = time.monotonic() - start
+                bar.set_postfix(amostras_s=f"{progress.value / elapsed:.1f}",
+                                shards=sum(future.done() for future in futures))
+            bar.update(progress.value - bar.n)
+        linhas = sum(future.result() for future in futures)
+
+    elapsed = time.monotonic() - start
+    print(f"{linhas} exemplos em {shards} shards, {elapsed:.0f} s "
+          f"({num_samples / elapsed:.1f} amostras/s com {workers} processos)")
+    total = merge_shards(shard_dir, output, csv_output)
+    if total == 0:
+        print("Erro: Nenhum exemplo foi gerado. O dataset está vazio.")
+    else:
+        print(f"Dataset gerado com sucesso! Total de exemplos: {total}")
+    return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=15000, help="número de exemplos")
+    parser.add_argument('--workers', type=int, default=None, help="processos (predefinido: todos os CPUs)")
+    parser.add_argument('--shards', type=int, default=None, help="predefinido: 4 por processo")
+    parser.add_argument('--shard-dir', default='shards')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--iterations', type=int, default=1000, help="iterações do MCTS por posição")
+    parser.add_argument('--output', default=DEFAULT_DATASET)
+    parser.add_argument('--csv', default=None, help="exporta também o dataset para este CSV")
+    parser.add_argument('--book', default=None, help="livro de aberturas (opening_book.py) usado nas pesquisas")
+    args = parser.parse_args()
+    generate(args.samples, args.workers, args.shards, args.shard_dir, args.seed,
+             args.iterations, args.output, args.csv, args.book)
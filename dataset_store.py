@@ -0,0 +1,248 @@
+"""Binary dataset files: a small header followed by fixed-width integer rows.
+
+Layout of a ``.c4`` file:
+
+    b"C4DS"                 magic
+    uint32 (little endian)  header length in bytes
+    JSON header             version, column names, dtypes and free-form
+                            metadata (e.g. ``"canonical": true``), padded
+                            with spaces so the rows start 64-byte aligned
+    rows                    one packed record per row
+
+``dtype`` in the header is one dtype for every column or a list of
+``[dtype, count]`` runs over the columns. Each run is a block (field
+``b0``, ``b1``, ... of the record), so the board, player and move stay
+int8 (44 bytes per position) while wider columns such as the visit counts
+(``visits_*``) or the ``sample`` column of generator shards get an int32
+block of their own. The row count is not stored, it follows from the
+file size, so ``DatasetWriter`` appends by just writing records at the end
+(a torn last record from a crash is dropped when the file is reopened).
+``open_dataset`` memory-maps the records, so reading is zero-copy and
+``column_view`` returns views of the columns of a block.
+
+Usage: python dataset_store.py import data.csv data.c4 [--canonicalize]
+       python dataset_store.py export data.c4 data.csv
+"""
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"C4DS"
+FORMAT_VERSION = 2
+READ_VERSIONS = (1, 2)  # A versão 1 só tinha um dtype para todas as colunas
+ALIGN = 64
+COLUMNS = [f"cell_{i}" for i in range(42)] + ["player", "move"]
+# Optional label distribution: root visits of each column (canonical orientation)
+VISIT_COLUMNS = [f"visits_{c}" for c in range(7)]
+WIDE_COLUMNS = set(VISIT_COLUMNS) | {"sample"}  # Não cabem em int8
+
+
+def default_dtypes(columns):
+    """int32 for the visit counts and ``sample``, int8 for everything else."""
+    return [np.dtype(np.int32 if name in WIDE_COLUMNS else np.int8) for name in columns]
+
+
+def read_header(path):
+    """``(header, offset)`` of a dataset file; rows start at ``offset``."""
+    with open(path, "rb") as f:
+        if f.read(4) != MAGIC:
+            raise ValueError(f"{path}: not a dataset file")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length))
+    if header.get("version") not in READ_VERSIONS:
+        raise ValueError(f"{path}: dataset format version {header.get('version')}, expected {FORMAT_VERSION}")
+    return header, 8 + length
+
+
+def _column_dtypes(header):
+    dtype = header["dtype"]
+    if isinstance(dtype, str):
+        return [np.dtype(dtype)] * len(header["columns"])
+    return [np.dtype(kind) for kind, count in dtype for _ in range(count)]
+
+
+def _blocks(dtypes):
+    # (primeira coluna, fim, dtype) de cada sequência de colunas com o mesmo dtype
+    blocks = []
+    for i, dtype in enumerate(dtypes):
+        if blocks and blocks[-1][2] == dtype:
+            blocks[-1][1] = i + 1
+        else:
+            blocks.append([i, i + 1, dtype])
+    return blocks
+
+
+def record_dtype(header):
+    """Packed record dtype of one row: a field ``b<i>`` per block of columns."""
+    return np.dtype([(f"b{i}", dtype, (stop - start,))
+                     for i, (start, stop, dtype) in enumerate(_blocks(_column_dtypes(header)))])
+
+
+def num_rows(path):
+    header, offset = read_header(path)
+    return (os.path.getsize(path) - offset) // record_dtype(header).itemsize
+
+
+def open_dataset(path):
+    """Memory-maps the rows of ``path``: returns ``(rows, header)``.
+
+    ``rows`` is a read-only array of records (``record_dtype``); use
+    ``column_view`` to get columns by name (``header["columns"]``).
+    """
+    header, offset = read_header(path)
+    dtype = record_dtype(header)
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    if count == 0:
+        return np.empty(0, dtype=dtype), header
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,)), header
+
+
+def column_view(rows, header, names):
+    """Columns ``names`` of ``rows`` as a 2-D array.
+
+    A view of the memory map when the columns are consecutive in one block,
+    otherwise a copy stacked column by column.
+    """
+    columns = header["columns"]
+    indices = [columns.index(name) for name in names]
+    first = indices[0]
+    if indices == list(range(first, first + len(indices))):
+        for i, (start, stop, _) in enumerate(_blocks(_column_dtypes(header))):
+            if start <= first and first + len(indices) <= stop:
+                return rows[f"b{i}"][:, first - start:first - start + len(indices)]
+    return np.column_stack([column_view(rows, header, [name]) for name in names])
+
+
+def feature_columns(columns):
+    """Indices of the feature columns (board cells and player) in ``columns``."""
+    return [i for i, name in enumerate(columns) if name.startswith("cell_") or name == "player"]
+
+
+def load_arrays(path):
+    """``(X, y, header)``: cells and player as features, ``move`` as label.
+
+    Other columns (label distributions, the ``sample`` bookkeeping column of
+    generator shards) are left out. X and y are views of the memory map when
+    the feature columns are consecutive in one block.
+    """
+    rows, header = open_dataset(path)
+    columns = header["columns"]
+    X = column_view(rows, header, [columns[i] for i in feature_columns(columns)])
+    return X, column_view(rows, header, ["move"])[:, 0], header
+
+
+class DatasetWriter:
+    """Appends rows to a dataset file, creating it (with its header) if needed.
+
+    ``dtype`` is one dtype for all columns or one per column; by default
+    ``default_dtypes(columns)``. Reopening an existing file keeps its header
+    (``columns`` and dtypes must match) and drops a partial last row. Extra
+    keyword arguments are stored in the header of a new file.
+    """
+
+    def __init__(self, path, columns=COLUMNS, dtype=None, **meta):
+        self.path = path
+        self.columns = list(columns)
+        if dtype is None:
+            dtypes = default_dtypes(self.columns)
+        elif isinstance(dtype, (list, tuple)):
+            dtypes = [np.dtype(kind) for kind in dtype]
+        else:
+            dtypes = [np.dtype(dtype)] * len(self.columns)
+        if len(dtypes) != len(self.columns):
+            raise ValueError("one dtype per column expected")
+        if os.path.exists(path):
+            header, offset = read_header(path)
+            if header["columns"] != self.columns or _column_dtypes(header) != dtypes:
+                raise ValueError(f"{path}: existing file has other columns or dtypes")
+            self.header = header
+            self.record = record_dtype(header)
+            self.rows = (os.path.getsize(path) - offset) // self.record.itemsize
+            self._file = open(path, "r+b")
+            self._file.truncate(offset + self.rows * self.record.itemsize)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            runs = [[kind.str, stop - start] for start, stop, kind in _blocks(dtypes)]
+            self.header = dict(meta, version=FORMAT_VERSION, columns=self.columns,
+                               dtype=runs[0][0] if len(runs) == 1 else runs)
+            self.record = record_dtype(self.header)
+            encoded = json.dumps(self.header).encode()
+            encoded += b" " * (-(8 + len(encoded)) % ALIGN)
+            self.rows = 0
+            self._file = open(path, "wb")
+            self._file.write(MAGIC + struct.pack("<I", len(encoded)) + encoded)
+        self._blocks = _blocks(dtypes)
+
+    def append(self, rows):
+        """Writes one row or a 2-D array of rows and flushes them to disk."""
+        rows = np.asarray(rows)
+        rows = rows.reshape(-1, len(self.columns))
+        records = np.empty(len(rows), dtype=self.record)
+        for i, (start, stop, dtype) in enumerate(self._blocks):
+            converted = rows[:, start:stop].astype(dtype)
+            if not np.array_equal(converted, rows[:, start:stop]):
+                raise ValueError(f"values of {self.columns[start]}..{self.columns[stop - 1]} do not fit in {dtype}")
+            records[f"b{i}"] = converted
+        self._file.write(records.tobytes())
+        self._file.flush()
+        self.rows += len(rows)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_dataset(path, rows, columns=COLUMNS, dtype=None, **meta):
+    """Writes a whole dataset file (replacing ``path``)."""
+    if os.path.exists(path):
+        os.remove(path)
+    with DatasetWriter(path, columns, dtype, **meta) as writer:
+        writer.append(rows)
+
+
+def import_csv(csv_path, path, canonicalize=False):
+    """Converts a dataset CSV (rows without ``move`` are skipped).
+
+    With ``canonicalize`` every position is stored in canonical mirror
+    orientation and the header says so (``"canonical": true``).
+    """
+    df = pd.read_csv(csv_path).dropna(subset=["move"])
+    columns = list(df.columns)
+    rows = df.astype(int).values
+    if canonicalize:
+        from symmetry import canonical_features
+        move = columns.index("move")
+        features = feature_columns(columns)
+        X, y, mirrored = canonical_features(rows[:, features], rows[:, move])
+        rows[:, features], rows[:, move] = X, y
+        visits = [columns.index(name) for name in VISIT_COLUMNS if name in columns]
+        if visits:
+            rows[np.ix_(mirrored, visits)] = rows[np.ix_(mirrored, visits[::-1])]
+    write_dataset(path, rows, columns, canonical=canonicalize)
+    return len(rows)
+
+
+def export_csv(path, csv_path):
+    rows, header = open_dataset(path)
+    values = column_view(rows, header, header["columns"])
+    pd.DataFrame(np.asarray(values), columns=header["columns"]).to_csv(csv_path, index=False)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] not in ("import", "export"):
+        sys.exit(__doc__.split("Usage: ")[1])
+    if sys.argv[1] == "import":
+        count = import_csv(sys.argv[2], sys.argv[3], canonicalize="--canonicalize" in sys.argv[4:])
+    else:
+        count = export_csv(sys.argv[2], sys.argv[3])
+    print(f"{count} linhas")
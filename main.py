@@ -1,12 +1,12 @@
 import pygame
 import sys
-import pickle
 from connect_four import ConnectFour
-from mcts import MCTS
+from mcts import MCTSSession
+from negamax import AlphaBeta
 import random
-from ID3_MCTS import DecisionTree
 from ID3_MCTS import predict_connect4_move
-from ID3_MCTS import train_tree
+from model_store import load_or_train
+from opening_book import load_book
 
 
 BLUE = (120, 180, 255)       # Azul clarinho para botões
@@ -31,13 +31,6 @@ SMALL_FONT = pygame.font.SysFont("arial", 24)
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Connect Four IA")
 
-# Tenta carregar o classificador ID3
-try:
-    with open('id3_classifier.pkl', 'rb') as f:
-        id3_classifier = pickle.load(f)
-except Exception:
-    id3_classifier = None  # Certifique-se de importar a função predict
-
 def draw_board(board):
     screen.fill(DARK_GRAY)
     # Tabuleiro
@@ -63,17 +56,18 @@ def draw_menu(selected=0):
         "IA vs IA",
         "ID3 vs ID3",
         "Player vs ID3",
-        "ID3 vs MCTS"
+        "ID3 vs MCTS",
+        "Player vs Alpha-Beta"
     ]
-    margin_y = 30
-    button_height = 60
+    margin_y = 20
+    button_height = 56
     buttons = []
 
     for i, opt in enumerate(options):
         text = FONT.render(opt, True, BLACK)
         btn_width = text.get_width() + 60
         btn_x = WIDTH//2 - btn_width//2
-        btn_y = 180 + i * (button_height + margin_y)
+        btn_y = 150 + i * (button_height + margin_y)
         rect = pygame.Rect(btn_x, btn_y, btn_width, button_height)
         buttons.append(rect)
         color = BLUE_HOVER if i == selected else BLUE
@@ -132,13 +126,18 @@ def menu_loop():
 def get_valid_moves(game):
     return [col for col in range(COLS) if game.is_valid_location(col)]
 
-tree = train_tree()
+# Carrega a árvore ID3 guardada (só treina se faltar ou o dataset mudou)
+tree = load_or_train()
+book = load_book()  # Livro de aberturas (opening_book.py), se existir
 
 def game_loop(mode):
     game = ConnectFour(ROWS, COLS)
     turn = 0  # 0: Player 1, 1: Player 2 / IA / ID3 / MCTS
     game_over = False
-    mcts = None
+    # A mesma sessão MCTS acompanha o jogo todo e reaproveita a árvore entre turnos
+    sessao = MCTSSession(iterations=700 if mode == 1 else 400, book=book)
+    motor = AlphaBeta(time_limit_ms=1000)  # Adversário do modo Player vs Alpha-Beta
+    nome_ia = "Alpha-Beta" if mode == 6 else "MCTS"
     percentages = {}
 
     draw_board(game.get_board())
@@ -250,9 +249,7 @@ def game_loop(mode):
                 pygame.time.wait(400)
                 valid_moves = get_valid_moves(game)
                 if valid_moves:
-                    mcts = MCTS(game, iterations=400)
-                    mcts.run()
-                    col = mcts.get_best_move()
+                    col = sessao.search(game)
                     if col is not None and game.is_valid_location(col):
                         game.drop_piece(col, 2)
                         draw_board(game.get_board())
@@ -277,9 +274,7 @@ def game_loop(mode):
 
         elif mode == 2:  # IA vs IA
             pygame.time.wait(400)
-            mcts = MCTS(game, iterations=400)
-            mcts.run()
-            col = mcts.get_best_move()
+            col = sessao.search(game)
             if col is not None and game.is_valid_location(col):
                 game.drop_piece(col, current_player)
                 draw_board(game.get_board())
@@ -331,7 +326,7 @@ def game_loop(mode):
                             turn = 1 - turn
                         pygame.display.update()
 
-            elif mode == 1:  # Player vs IA
+            elif mode in (1, 6):  # Player vs IA (MCTS ou Alpha-Beta)
                 if turn == 0:  # Jogador
                     if event.type == pygame.MOUSEMOTION:
                         draw_board(game.get_board())
@@ -356,23 +351,25 @@ def game_loop(mode):
                                 turn = 1
                             pygame.display.update()
                 else:  # IA
-                    show_message("MCTS a pensar...", YELLOW)
+                    show_message(f"{nome_ia} a pensar...", YELLOW)
                     pygame.display.update()
-                    mcts = MCTS(game, iterations=700)
-                    mcts.run()
-                    percentages = mcts.get_win_percentages()
-                    col = mcts.get_best_move()
+                    if mode == 6:
+                        col = motor.search(game)
+                    else:
+                        col = sessao.search(game)
+                        percentages = sessao.get_win_percentages()
                     pygame.time.wait(400)
                     if col is not None and game.is_valid_location(col):
                         game.drop_piece(col, 2)
                         draw_board(game.get_board())
-                        draw_percentages(percentages)
-                        show_message(f"MCTS jogou na coluna {col}")
+                        if percentages:
+                            draw_percentages(percentages)
+                        show_message(f"{nome_ia} jogou na coluna {col}")
                         pygame.display.update()
 
                         if game.check_win(2):
-                            show_message("MCTS venceu!", YELLOW)
-                            print(f"MCTS VENCEU")
+                            show_message(f"{nome_ia} venceu!", YELLOW)
+                            print(f"{nome_ia.upper()} VENCEU")
                             game_over = True
                         elif game.is_tie():
                             show_message("Empate!", WHITE)
@@ -388,5 +385,5 @@ def game_loop(mode):
 
 if __name__ == "__main__":
     while True:
-        mode = menu_loop()  # 0: PvP, 1: PvIA, 2: IAvsIA, 3: ID3vsID3, 4: ID3vsEU, 5: ID3vsID3+MCTS
+        mode = menu_loop()  # 0: PvP, 1: PvIA, 2: IAvsIA, 3: ID3vsID3, 4: ID3vsEU, 5: ID3vsID3+MCTS, 6: PvAlphaBeta
         game_loop(mode)
\ No newline at end of file
@@ -1,132 +1,552 @@
 import math
+import multiprocessing
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from multiprocessing import shared_memory
+
 import numpy as np
 
-class Node:
-    def __init__(self, game, parent=None, move=None):
-        self.game = game  # Estado do jogo
-        self.parent = parent
-        self.move = move  # Jogada que levou a este estado
-        self.children = {}  # move: Node
-        self.wins = 0
-        self.visits = 0
-
-    def is_fully_expanded(self):
-        return len(self.children) == len(self.game.get_valid_locations())
-
-    def is_terminal(self):
-        return self.game.check_win(1) or self.game.check_win(2) or self.game.is_tie()
-
-    def uct_value(self, exploration_constant=math.sqrt(2)):
-        if self.visits == 0:
-            return float('inf')  # Priorizar nós não visitados
-        exploitation = self.wins / self.visits
-        exploration = exploration_constant * math.sqrt(math.log(self.parent.visits) / self.visits)
-        return exploitation + exploration
-
-    def select_child(self):
-        # Seleciona o filho com maior UCT
-        return max(self.children.values(), key=lambda c: c.uct_value())
-
-    def expand(self):
-        # Adiciona todos os filhos válidos que ainda não existem
-        valid_moves = self.game.get_valid_locations()
-        for move in valid_moves:
-            if move not in self.children:
-                new_game = self.game.copy()
-                new_game.drop_piece(move, new_game.get_current_player())
-                new_game.switch_player()
-                self.children[move] = Node(new_game, parent=self, move=move)
+from node_pool import NodePool
+from batch_rollout import simulate
+from rollout_policies import get_rollout_policy, random_rollout, tactical_rollout
+from transposition import TranspositionTable
+
+EARLY_STOP_CHECK = 16  # Iterações entre verificações da paragem antecipada
+_executors = {}  # workers: ProcessPoolExecutor, reutilizados entre pesquisas
+
+
+def _get_executor(workers):
+    if workers not in _executors:
+        _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _executors[workers]
+
+
+def _root_parallel_worker(game, iterations, seed, deadline, early_stop, options):
+    # Corre num processo à parte: árvore independente, devolve só a raiz
+    random.seed(seed)
+    mcts = MCTS(game, iterations=iterations, **options)
+    mcts._search(iterations, deadline=deadline, early_stop=early_stop)
+    return mcts.root_statistics()
+
+
+def _tree_parallel_worker(shm_name, max_nodes, game, root, iterations, seed, lock, virtual_loss,
+                          deadline, early_stop, workers, rollout_policy, leaf_rollouts):
+    # Corre num processo à parte sobre a árvore em memória partilhada
+    random.seed(seed)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    mcts = MCTS(game, iterations=iterations, max_nodes=max_nodes, rollout_policy=rollout_policy,
+                leaf_rollouts=leaf_rollouts)
+    mcts.pool = NodePool(max_nodes, buffer=shm.buf)
+    mcts.root = root
+    mcts._lock = lock
+    mcts._search(iterations, virtual_loss, deadline, early_stop, workers)
+    del mcts  # Liberta as vistas sobre o buffer antes de fechar
+    shm.close()
 
-    def rollout(self):
-        # Simulação aleatória até ao fim do jogo
-        current_game = self.game.copy()
-        current_player = current_game.get_current_player()
-
-        while not current_game.check_win(1) and not current_game.check_win(2) and not current_game.is_tie():
-            valid_moves = current_game.get_valid_locations()
-            move = random.choice(valid_moves)
-            current_game.drop_piece(move, current_player)
-            current_game.switch_player()
-            current_player = current_game.get_current_player()
-
-        if current_game.check_win(2):
-            return 2
-        elif current_game.check_win(1):
-            return 1
-        else:
-            return 0  # empate
-
-    def backpropagate(self, result):
-        self.visits += 1
-        # Se o resultado é vitória do jogador que fez a jogada para chegar neste nó, soma 1
-        # Caso contrário, soma 0
-        if self.parent is None:
-            # Raiz: não tem jogador associado, ignora
-            pass
-        else:
-            player_who_moved = 3 - self.game.get_current_player()  # jogador que fez a jogada para chegar aqui
-            if result == player_who_moved:
-                self.wins += 1
-        if self.parent:
-            self.parent.backpropagate(result)
 
 class MCTS:
-    def __init__(self, game, iterations=100000):
-        self.root = Node(game)
+    """Monte Carlo Tree Search sobre uma árvore compacta (NodePool).
+
+    Os nós guardam apenas a jogada e as estatísticas; o estado de cada nó é
+    obtido jogando a partir da raiz sobre uma única cópia do jogo
+    (``self.game``), que é reposta com undo_move no fim de cada iteração.
+    ``max_nodes`` limita o tamanho da árvore: atingido o limite, as folhas
+    deixam de ser expandidas e a pesquisa continua só com simulações.
+
+    Com ``workers > 1`` a pesquisa é paralela na raiz: cada processo constrói
+    uma árvore independente a partir do mesmo estado, com a sua semente e a
+    sua parte das iterações, e as visitas/vitórias dos filhos da raiz são
+    somadas nesta árvore. Com ``parallel="tree"`` os processos descem todos
+    a mesma árvore, guardada em memória partilhada; cada nó no caminho de um
+    processo recebe ``virtual_loss`` visitas sem vitória até ao fim da
+    simulação, para que os outros processos escolham caminhos diferentes.
+
+    Com ``transpositions=True`` as posições já presentes na árvore (mesmo
+    que alcançadas por outra ordem de jogadas) são partilhadas através de
+    uma tabela de transposições com até ``tt_size`` entradas: o novo nó
+    torna-se um alias (NodePool.ref) do existente, que guarda as estatísticas
+    e os filhos, e a árvore passa a ser um DAG. ``symmetry=True`` (implica
+    transpositions) usa a chave normalizada pelo espelho horizontal, para
+    que uma posição e a sua imagem partilhem o mesmo nó; ao descer por um
+    alias espelhado as jogadas dos filhos são lidas espelhadas.
+
+    ``rollout_policy`` escolhe as jogadas das simulações: "random" (a
+    original), "tactical" (ganha já ou bloqueia a derrota imediata),
+    "greedy" (epsilon-greedy sobre score_move) ou qualquer função
+    policy(game) -> coluna (ver rollout_policies).
+
+    Com ``leaf_rollouts > 1`` cada folha é avaliada com esse número de
+    simulações de uma só vez, no simulador vetorizado (batch_rollout), e
+    todas entram na retropropagação; só as políticas "random" e "tactical"
+    têm versão vetorizada.
+
+    Com ``book`` (um opening_book.OpeningBook), antes de pesquisar uma
+    posição que está no livro as suas estatísticas guardadas (visitas e
+    vitórias por jogada) são somadas aos filhos da raiz, como se essas
+    iterações já tivessem sido feitas.
+    """
+
+    def __init__(self, game, iterations=100000, max_nodes=1_000_000, workers=1,
+                 parallel="root", virtual_loss=1, transpositions=False, tt_size=1_000_000,
+                 symmetry=False, rollout_policy="random", leaf_rollouts=1, book=None):
+        transpositions = transpositions or symmetry
+        if parallel not in ("root", "tree"):
+            raise ValueError(f"parallel must be 'root' or 'tree', got {parallel!r}")
+        if transpositions and parallel == "tree" and workers > 1:
+            raise ValueError("transpositions are not supported with parallel='tree'")
+        self.game = game.copy()  # Jogo de trabalho, no estado da raiz entre iterações
         self.iterations = iterations
+        self.workers = workers
+        self.parallel = parallel
+        self.virtual_loss = virtual_loss
+        self.rollout_policy = get_rollout_policy(rollout_policy)
+        self.leaf_rollouts = leaf_rollouts
+        if leaf_rollouts > 1:
+            self._batch_policy = {random_rollout: "random", tactical_rollout: "tactical"}.get(self.rollout_policy)
+            if self._batch_policy is None:
+                raise ValueError("leaf_rollouts > 1 needs the 'random' or 'tactical' rollout policy")
+            self._rng = np.random.default_rng(random.getrandbits(64))
+        self._lock = nullcontext()  # Lock partilhado na pesquisa em árvore paralela
+        self.book = book
+        self._book_key = None  # Posição cujas estatísticas do livro já foram somadas
+        self.pool = NodePool(max_nodes=max_nodes)
+        self.root = self.pool.add_root()
+        self.symmetry = symmetry
+        self._root_flipped = False  # A raiz guarda a posição espelhada do jogo
+        self.tt = TranspositionTable(tt_size) if transpositions else None
+        if self.tt is not None:
+            key, mirrored = self._position_key()
+            self.tt.put(key, self.root, mirrored)
+
+    def _position_key(self):
+        # (chave, espelhada) da posição atual do jogo de trabalho
+        if self.symmetry:
+            return self.game.canonical_key()
+        return self.game.key(), False
+
+    def _frame_moves(self, flipped):
+        # Jogadas válidas vistas do referencial do nó (espelhado ou não), por ordem
+        moves = self.game.get_valid_locations()
+        if flipped:
+            return tuple(self.game.mirror_move(m) for m in reversed(moves))
+        return moves
+
+    def _play(self, node, flipped=False):
+        # Avança o jogo de trabalho com a jogada que leva a `node`
+        move = int(self.pool.move[node])
+        if flipped:
+            move = self.game.mirror_move(move)
+        self.game.drop_piece(move, int(self.pool.player[node]))
+        self.game.switch_player()
+
+    def _reset(self, root_moves, root_player):
+        # Desfaz tudo o que foi jogado desde a raiz (descida + rollout)
+        game = self.game
+        while game.move_count > root_moves:
+            game.undo_move(game.history[-1])
+        game.current_player = root_player
+
+    def _children_stats(self, node):
+        # Nós (canónicos) com as estatísticas dos filhos de `node`
+        pool = self.pool
+        first = pool.first_child[node]
+        return pool.ref[first:first + pool.num_children[node]]
+
+    def uct_values(self, node, exploration_constant=math.sqrt(2)):
+        # UCT de todos os filhos de `node` de uma só vez; o log das visitas
+        # do pai é calculado uma única vez. Filhos por visitar valem inf.
+        pool = self.pool
+        stats = self._children_stats(node)
+        visits = pool.visits[stats]
+        if not visits.all():
+            return np.where(visits == 0, np.inf, 0.0)
+        log_parent = math.log(pool.visits[node])
+        return pool.wins[stats] / visits + exploration_constant * np.sqrt(log_parent / visits)
+
+    def select_child(self, node):
+        # Seleciona o filho com maior UCT (o primeiro, em caso de empate)
+        return int(self.pool.first_child[node] + np.argmax(self.uct_values(node)))
 
     def select(self, node):
-        while not node.is_terminal():
-            if not node.is_fully_expanded():
-                return self.expand(node)
+        # Descida iterativa desde `node`; devolve o caminho percorrido (folha
+        # no fim), já com os nós canónicos, que são os que levam as estatísticas
+        # `flipped` indica se o referencial do nó atual é o espelho do jogo
+        pool = self.pool
+        path = [node]
+        flipped = self._root_flipped
+        while not self.game.is_terminal():
+            if pool.num_children[node] == 0:
+                child = self.expand(node, flipped)
+                if child != node:
+                    path.append(int(pool.ref[child]))
+                return path
+            child = self.select_child(node)
+            self._play(child, flipped)
+            flipped ^= bool(pool.mirror[child])
+            node = int(pool.ref[child])
+            path.append(node)
+        return path
+
+    def expand(self, node, flipped=False):
+        # Adiciona todos os filhos válidos de uma vez (se outro processo não
+        # o tiver feito entretanto)
+        pool = self.pool
+        with self._lock:
+            if pool.num_children[node] == 0:
+                first = pool.add_children(node, self._frame_moves(flipped), self.game.get_current_player())
+                if first < 0:
+                    return node  # Limite de nós atingido: simula a partir daqui
+                if self.tt is not None:
+                    self._link_transpositions(node, flipped)
+        # Retorna um filho aleatório (acabados de criar, nenhum foi visitado)
+        child = random.choice(pool.children(node))
+        self._play(child, flipped)
+        return child
+
+    def _link_transpositions(self, node, flipped=False):
+        # Liga cada filho novo ao nó que já tenha a mesma posição, ou regista-o
+        pool, game = self.pool, self.game
+        for child in pool.children(node):
+            self._play(child, flipped)
+            key, mirrored = self._position_key()
+            game.switch_player()
+            game.undo_move(game.history[-1])
+            mirrored ^= flipped  # Relativo ao referencial do filho
+            known = self.tt.get(key)
+            if known is None:
+                self.tt.put(key, child, mirrored)
             else:
-                node = node.select_child()
-        return node
-
-    def expand(self, node):
-        node.expand()
-        # Retorna um filho aleatório ainda não visitado
-        unvisited = [child for child in node.children.values() if child.visits == 0]
-        if unvisited:
-            return random.choice(unvisited)
+                pool.ref[child] = known[0]
+                pool.mirror[child] = mirrored ^ known[1]
+
+    def rollout(self):
+        # Simulação até ao fim do jogo, sobre o jogo de trabalho
+        game = self.game
+        policy = self.rollout_policy
+        while not game.is_terminal():
+            move = policy(game)
+            game.drop_piece(move, game.get_current_player())
+            game.switch_player()
+        return game.winner  # 0 em caso de empate
+
+    def rollout_batch(self):
+        # `leaf_rollouts` simulações vetorizadas a partir do jogo de trabalho;
+        # devolve as contagens [empates, vitórias do 1, vitórias do 2]
+        winners = simulate(self.game, self.leaf_rollouts, self._batch_policy, self._rng)
+        return np.bincount(winners, minlength=3)
+
+    def backpropagate_counts(self, path, counts, virtual_loss=0):
+        # Como backpropagate, para o resultado de rollout_batch
+        pool = self.pool
+        nodes = np.array(path)
+        with self._lock:
+            pool.visits[nodes] += int(counts.sum()) - virtual_loss
+            moved = nodes[1:]
+            pool.wins[moved] += counts[pool.player[moved]]
+
+    def backpropagate(self, path, result, virtual_loss=0):
+        # Atualiza todo o caminho de uma vez (retirando a perda virtual). Soma
+        # 1 às vitórias dos nós cuja jogada foi feita pelo vencedor (a raiz,
+        # path[0], não tem jogador)
+        pool = self.pool
+        nodes = np.array(path)
+        with self._lock:
+            pool.visits[nodes] += 1 - virtual_loss
+            if result:
+                moved = nodes[1:]
+                pool.wins[moved[pool.player[moved] == result]] += 1
+
+    def run(self, time_limit_ms=None, early_stop=False):
+        """Pesquisa até `iterations` iterações ou até esgotar `time_limit_ms`.
+
+        Com early_stop=True pára assim que o filho mais visitado da raiz já
+        não pode ser ultrapassado com as iterações (ou o tempo) que restam.
+        Devolve o número de iterações feitas.
+        """
+        deadline = None if time_limit_ms is None else time.monotonic() + time_limit_ms / 1000
+        return self._run(self.iterations, deadline, early_stop)
+
+    def search_anytime(self, interval_ms=100, time_limit_ms=None, early_stop=False):
+        """Versão "anytime" de run(): a cada `interval_ms` produz um tuplo
+        (melhor jogada, percentagens) com o estado atual da pesquisa. Termina
+        quando se esgotam as iterações ou o tempo, ou com a paragem antecipada.
+        """
+        start = time.monotonic()
+        deadline = None if time_limit_ms is None else start + time_limit_ms / 1000
+        remaining = self.iterations
+        while True:
+            tick = time.monotonic() + interval_ms / 1000
+            remaining -= self._run(remaining, tick if deadline is None else min(tick, deadline), early_stop)
+            yield self.get_best_move(), self.get_win_percentages()
+            now = time.monotonic()
+            if remaining <= 0 or (deadline is not None and now >= deadline):
+                return
+            if early_stop and self._best_is_decided(self._remaining_estimate(
+                    remaining, self.iterations - remaining, now - start, deadline, now)):
+                return
+
+    def consult_book(self):
+        """Soma as estatísticas do livro à raiz (uma vez por posição; run() chama-o)."""
+        if self.book is None:
+            return
+        key = self.game.key()
+        if key == self._book_key:
+            return
+        self._book_key = key
+        statistics = self.book.root_statistics(self.game)
+        if statistics:
+            self.merge_root_statistics(statistics)
+
+    def _run(self, iterations, deadline, early_stop):
+        self.consult_book()
+        before = int(self.pool.visits[self.root])
+        if self.workers <= 1:
+            self._search(iterations, deadline=deadline, early_stop=early_stop)
+        elif self.parallel == "tree":
+            self._run_tree_parallel(iterations, deadline, early_stop)
         else:
-            # Se todos visitados, retorna qualquer filho
-            return random.choice(list(node.children.values()))
+            self._run_root_parallel(iterations, deadline, early_stop)
+        # Cada iteração soma leaf_rollouts visitas à raiz
+        return (int(self.pool.visits[self.root]) - before) // self.leaf_rollouts
+
+    @staticmethod
+    def _remaining_estimate(remaining, done, elapsed, deadline, now):
+        # Iterações que ainda cabem no orçamento, estimadas pelo ritmo atual
+        if deadline is not None and done and elapsed > 0:
+            remaining = min(remaining, (deadline - now) * done / elapsed)
+        return remaining
+
+    def _best_is_decided(self, remaining):
+        # Verdadeiro se o filho mais visitado da raiz já não pode ser
+        # ultrapassado com `remaining` iterações (ou se só há uma jogada).
+        # Filhos espelhados que partilham um nó contam uma só vez, com a
+        # parte de cada um, como em root_statistics
+        stats = self._children_stats(self.root)
+        if len(stats) == 0:
+            return False
+        refs, aliases = np.unique(stats, return_counts=True)
+        if len(refs) == 1:
+            return True
+        visits = np.sort(self.pool.visits[refs] / aliases)
+        return visits[-1] - visits[-2] > remaining
+
+    def _search(self, iterations, virtual_loss=0, deadline=None, early_stop=False, workers=1):
+        # `workers` é o número de processos a partilhar esta árvore: as
+        # iterações que faltam aos outros também contam para a paragem antecipada
+        root_moves = self.game.move_count
+        root_player = self.game.get_current_player()
+        start = time.monotonic()
+        for i in range(iterations):
+            if deadline is not None or early_stop:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                if early_stop and i % EARLY_STOP_CHECK == 0:
+                    remaining = self._remaining_estimate(iterations - i, i, now - start, deadline, now)
+                    if self._best_is_decided(remaining * workers * self.leaf_rollouts):
+                        break
+            path = self.select(self.root)
+            if virtual_loss:
+                with self._lock:
+                    self.pool.visits[np.array(path)] += virtual_loss
+            if self.leaf_rollouts > 1:
+                self.backpropagate_counts(path, self.rollout_batch(), virtual_loss)
+            else:
+                result = self.rollout()
+                self.backpropagate(path, result, virtual_loss)
+            self._reset(root_moves, root_player)
 
-    def run(self):
-        for _ in range(self.iterations):
-            leaf = self.select(self.root)
-            result = leaf.rollout()
-            leaf.backpropagate(result)
+    def _run_root_parallel(self, iterations, deadline, early_stop):
+        # Divide as iterações pelos processos (os primeiros ficam com o resto)
+        share, extra = divmod(iterations, self.workers)
+        executor = _get_executor(self.workers)
+        options = {"max_nodes": self.pool.max_nodes, "transpositions": self.tt is not None,
+                   "tt_size": self.tt.capacity if self.tt is not None else 0,
+                   "symmetry": self.symmetry, "rollout_policy": self.rollout_policy,
+                   "leaf_rollouts": self.leaf_rollouts}
+        futures = [
+            executor.submit(_root_parallel_worker, self.game, share + (i < extra),
+                            random.getrandbits(32), deadline, early_stop, options)
+            for i in range(self.workers)
+        ]
+        for future in futures:
+            self.merge_root_statistics(future.result())
+
+    def _run_tree_parallel(self, iterations, deadline, early_stop):
+        # Copia a árvore para memória partilhada, pesquisa com vários processos
+        # sobre ela e traz o resultado de volta para uma árvore local
+        max_nodes = self.pool.max_nodes
+        shm = shared_memory.SharedMemory(create=True, size=NodePool.buffer_size(max_nodes))
+        try:
+            shared = NodePool(max_nodes, buffer=shm.buf)
+            shared.load(self.pool)
+            lock = multiprocessing.Lock()
+            share, extra = divmod(iterations, self.workers)
+            processes = [
+                multiprocessing.Process(
+                    target=_tree_parallel_worker,
+                    args=(shm.name, max_nodes, self.game, self.root, share + (i < extra),
+                          random.getrandbits(32), lock, self.virtual_loss,
+                          deadline, early_stop, self.workers, self.rollout_policy,
+                          self.leaf_rollouts))
+                for i in range(self.workers)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            if any(process.exitcode != 0 for process in processes):
+                raise RuntimeError("tree-parallel MCTS worker failed")
+            self.pool = shared.copy()
+            del shared
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def root_statistics(self):
+        """Lista (jogada, visitas, vitórias) dos filhos da raiz."""
+        # Numa raiz simétrica (symmetry=True) os filhos espelhados partilham
+        # o mesmo nó: as suas visitas e vitórias são repartidas entre eles,
+        # para que a soma das visitas seja a da pesquisa
+        pool = self.pool
+        children = pool.children(self.root)
+        refs = [int(pool.ref[c]) for c in children]
+        aliases = {ref: refs.count(ref) for ref in refs}
+        seen = dict.fromkeys(aliases, 0)
+        statistics = []
+        for child, ref in zip(children, refs):
+            total, count = int(pool.visits[ref]), aliases[ref]
+            visits = total // count + (seen[ref] < total % count)
+            seen[ref] += 1
+            wins = float(pool.wins[ref]) * visits / total if total else 0.0
+            statistics.append((self._root_move(int(pool.move[child])), visits, wins))
+        if self._root_flipped:
+            statistics.reverse()  # Por ordem crescente de coluna do jogo
+        return statistics
+
+    def _root_move(self, move):
+        # Converte entre as colunas do jogo e as do referencial da raiz
+        return self.game.mirror_move(move) if self._root_flipped else move
+
+    def merge_root_statistics(self, statistics):
+        """Soma estatísticas de outra árvore (root_statistics) aos filhos da raiz."""
+        pool = self.pool
+        if pool.num_children[self.root] == 0 and not self.game.is_terminal():
+            pool.add_children(self.root, self._frame_moves(self._root_flipped),
+                              self.game.get_current_player())
+            if self.tt is not None:
+                self._link_transpositions(self.root, self._root_flipped)
+        # Filhos espelhados que partilham um nó recebem cada um a sua parte
+        # (root_statistics reparte-as), por isso somam todos no mesmo nó
+        for move, visits, wins in statistics:
+            child = pool.find_child(self.root, self._root_move(move))
+            if child is None:
+                continue
+            pool.visits[pool.ref[child]] += visits
+            pool.wins[pool.ref[child]] += wins
+            pool.visits[self.root] += visits
 
     def get_best_move(self):
         # Escolhe o filho com mais visitas
         best_move = None
         best_visits = -1
-        for move, child in self.root.children.items():
-            if child.visits > best_visits:
-                best_visits = child.visits
+        for move, visits, _ in self.root_statistics():
+            if visits > best_visits:
+                best_visits = visits
                 best_move = move
         return best_move
 
     def make_move(self, move):
-        # Avança a raiz para o estado da jogada feita
-        if move in self.root.children:
-            self.root = self.root.children[move]
-            self.root.parent = None
+        # Avança a raiz para o estado da jogada feita, guardando só a
+        # subárvore dessa jogada (o resto da árvore é descartado)
+        child = self.pool.find_child(self.root, self._root_move(move))
+        self.game.drop_piece(move, self.game.get_current_player())
+        self.game.switch_player()
+        if child is None:
+            self.root = self.pool.add_root()
+            self._root_flipped = False
+            if self.tt is not None:
+                self.tt.clear()
+                key, mirrored = self._position_key()
+                self.tt.put(key, self.root, mirrored)
         else:
-            new_game = self.root.game.copy()
-            new_game.drop_piece(move, new_game.get_current_player())
-            new_game.switch_player()
-            self.root = Node(new_game)
+            self._root_flipped ^= bool(self.pool.mirror[child])
+            child = int(self.pool.ref[child])
+            self.pool, new_index = self.pool.subtree(child)
+            self.root = int(new_index[child])
+            if self.pool.num_children[self.root] == 0:
+                # Filho sem subárvore (estatísticas somadas dos processos da
+                # pesquisa paralela na raiz ou do livro): não há pesquisa
+                # para reaproveitar, a nova raiz recomeça do zero
+                self.pool.visits[self.root] = 0
+                self.pool.wins[self.root] = 0
+            if self.tt is not None:
+                self.tt.remap(new_index)
 
     def get_win_percentages(self):
         percentages = {}
-        for move, child in self.root.children.items():
-            if child.visits > 0:
-                percentages[move] = (child.wins / child.visits) * 100
+        for move, visits, wins in self.root_statistics():
+            if visits > 0:
+                percentages[move] = (wins / visits) * 100
             else:
                 percentages[move] = 0.0
         return percentages
 
+
+class MCTSSession:
+    """Pesquisa MCTS que acompanha um jogo real de uma jogada para a outra.
+
+    Em vez de criar um MCTS novo a cada turno, search(game) avança a árvore
+    da pesquisa anterior pelas jogadas feitas entretanto (as suas e as do
+    adversário, lidas de game.history) e continua a partir da subárvore
+    correspondente. Se o jogo não for a continuação do anterior, recomeça.
+    `carried_visits` indica quantas visitas da raiz vieram de turnos
+    anteriores na última pesquisa.
+
+    Com `book`, uma posição do livro com pelo menos `book_min_visits`
+    visitas é jogada diretamente com a jogada mais visitada, sem pesquisa
+    (`book_hit` indica se a última jogada veio do livro); nas restantes o
+    livro é passado ao MCTS.
+    """
+
+    def __init__(self, iterations=100000, book=None, book_min_visits=1000, **options):
+        self.iterations = iterations
+        self.book = book
+        self.book_min_visits = book_min_visits
+        self.options = dict(options, book=book)  # Restantes argumentos do MCTS
+        self.mcts = None
+        self.carried_visits = 0
+        self.book_hit = False
+        self._book_game = None
+
+    def sync(self, game):
+        """Avança a árvore até ao estado de `game` (ou recomeça-a)."""
+        if self.mcts is not None:
+            known = self.mcts.game.history
+            if game.history[:len(known)] == known:
+                for move in game.history[len(known):]:
+                    self.mcts.make_move(move)
+                current = self.mcts.game
+                if current.masks == game.masks and current.current_player == game.current_player:
+                    return
+        self.mcts = MCTS(game, iterations=self.iterations, **self.options)
+
+    def search(self, game, time_limit_ms=None, early_stop=False):
+        """Pesquisa a partir do estado de `game` e devolve a melhor jogada."""
+        if self.book is not None:
+            move = self.book.best_move(game, self.book_min_visits)
+            self.book_hit = move is not None
+            if self.book_hit:
+                self._book_game = game.copy()
+                return move
+        self.sync(game)
+        self.carried_visits = int(self.mcts.pool.visits[self.mcts.root])
+        self.mcts.run(time_limit_ms=time_limit_ms, early_stop=early_stop)
+        return self.mcts.get_best_move()
+
+    def get_win_percentages(self):
+        if self.book_hit:
+            return self.book.win_percentages(self._book_game)
+        return self.mcts.get_win_percentages() if self.mcts is not None else {}
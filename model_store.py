@@ -0,0 +1,107 @@
+"""Versioned on-disk format for trained ``DecisionTree`` models.
+
+A model is two files next to each other:
+
+    <name>.npy    structured array, one record per node in the layout of
+                  ``DecisionTree.compile()`` (feature, threshold, left,
+                  right, value); leaves have feature -1
+    <name>.json   format version, tree settings, node count and the hash of
+                  the dataset the tree was trained on
+
+The array is opened memory-mapped, so loading costs a file open and the
+nodes are paged in as predictions touch them. ``load_or_train`` retrains
+(and saves) only when the artifact is missing, from another format
+version, or was trained on a different dataset.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from ID3_MCTS import DEFAULT_DATASET, DecisionTree, load_dataset, train_tree
+
+MODEL_VERSION = 1
+DEFAULT_MODEL = "connect4_tree.npy"
+
+
+def sidecar_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def dataset_hash(X, y):
+    """SHA-256 of the training arrays (dtype, shape and contents)."""
+    digest = hashlib.sha256()
+    for array in (np.ascontiguousarray(X), np.ascontiguousarray(y)):
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def save_model(tree, path=DEFAULT_MODEL, data_hash=None):
+    """Writes ``tree`` as ``path`` (.npy) plus its JSON sidecar."""
+    flat = getattr(tree, "flat", None)
+    if flat is None:
+        flat = tree.compile()
+    dtype = np.dtype([
+        ("feature", np.int32),
+        ("threshold", np.float64),
+        ("left", np.int32),
+        ("right", np.int32),
+        ("value", flat["value"].dtype),
+    ])
+    records = np.empty(len(flat["feature"]), dtype=dtype)
+    for name in dtype.names:
+        records[name] = flat[name]
+    meta = {
+        "version": MODEL_VERSION,
+        "max_depth": tree.max_depth,
+        "canonical": bool(getattr(tree, "canonical", False)),
+        "nodes": len(records),
+        "dtype": [[name, records.dtype[name].str] for name in dtype.names],
+        "dataset_hash": data_hash,
+    }
+    # Escreve para ficheiros temporários e troca no fim, para nunca deixar
+    # um artefacto a meio
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, records)
+    with open(sidecar_path(path) + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(path + ".tmp", path)
+    os.replace(sidecar_path(path) + ".tmp", sidecar_path(path))
+
+
+def load_model(path=DEFAULT_MODEL, data_hash=None):
+    """Memory-maps a saved model as a ``DecisionTree`` (arrays only, no ``root``).
+
+    Raises FileNotFoundError if the files are missing and ValueError if they
+    are from another format version, inconsistent, or (when ``data_hash`` is
+    given) trained on a different dataset.
+    """
+    with open(sidecar_path(path)) as f:
+        meta = json.load(f)
+    if meta.get("version") != MODEL_VERSION:
+        raise ValueError(f"{path}: model format version {meta.get('version')}, expected {MODEL_VERSION}")
+    if data_hash is not None and meta.get("dataset_hash") != data_hash:
+        raise ValueError(f"{path}: trained on a different dataset")
+    records = np.load(path, mmap_mode="r")
+    expected = [(name, np.dtype(kind)) for name, kind in meta["dtype"]]
+    if [(name, records.dtype[name]) for name in records.dtype.names] != expected or len(records) != meta["nodes"]:
+        raise ValueError(f"{path}: array does not match its metadata")
+
+    tree = DecisionTree(max_depth=meta["max_depth"])
+    tree.canonical = meta["canonical"]
+    tree.flat = {name: records[name] for name in records.dtype.names}
+    return tree
+
+
+def load_or_train(path=DEFAULT_MODEL, dataset=DEFAULT_DATASET, workers=1):
+    """Loads the model for ``dataset``, training and saving it if needed."""
+    data_hash = dataset_hash(*load_dataset(dataset))
+    try:
+        return load_model(path, data_hash)
+    except (FileNotFoundError, ValueError):
+        pass
+    tree = train_tree(workers=workers, dataset=dataset)
+    save_model(tree, path, data_hash)
+    return load_model(path, data_hash)
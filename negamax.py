@@ -0,0 +1,156 @@
+import time
+
+WIN_SCORE = 1_000_000  # Vitória à distância d vale WIN_SCORE - d
+CENTER_ORDER = (3, 2, 4, 1, 5, 0, 6)
+TIME_CHECK = 1024  # Nós entre verificações do relógio
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget runs out."""
+
+
+class AlphaBeta:
+    """Jogador negamax com cortes alfa-beta sobre o ConnectFour (bitboard).
+
+    search(game) faz aprofundamento iterativo (profundidade 1, 2, ...) até
+    ``max_depth`` ou até esgotar ``time_limit_ms``, e devolve a melhor
+    jogada da última profundidade completa. As jogadas são ordenadas pela
+    melhor jogada guardada na tabela de transposições e depois do centro
+    para as bordas. As folhas são avaliadas com score_position (jogador a
+    jogar menos adversário); vitórias valem WIN_SCORE menos a distância, para
+    preferir as mais rápidas. A tabela (chave ConnectFour.key()) guarda até
+    ``tt_size`` posições e é mantida entre pesquisas; quando enche é limpa.
+    """
+
+    def __init__(self, time_limit_ms=1000, max_depth=42, tt_size=1_000_000):
+        self.time_limit_ms = time_limit_ms
+        self.max_depth = max_depth
+        self.tt_size = tt_size
+        self.tt = {}  # chave: (profundidade, tipo, valor, melhor jogada)
+        self.nodes = 0
+        self.depth = 0  # Última profundidade completa
+        self.best_score = 0
+        self._deadline = None
+
+    def search(self, game, time_limit_ms=None):
+        """Melhor jogada para o jogador a jogar em `game` (que não é alterado)."""
+        if time_limit_ms is None:
+            time_limit_ms = self.time_limit_ms
+        game = game.copy()
+        self._deadline = time.monotonic() + time_limit_ms / 1000 if time_limit_ms else None
+        self._root_count = game.move_count
+        self.nodes = 0
+        self.depth = 0
+        moves = self._ordered_moves(game, None)
+        best_move = moves[0]
+        max_depth = min(self.max_depth, game.rows * game.cols - game.move_count)
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = self._root(game, depth)
+            except SearchTimeout:
+                break
+            best_move, self.best_score, self.depth = move, score, depth
+            if abs(score) >= WIN_SCORE - game.rows * game.cols:
+                break  # Resultado forçado encontrado
+        return best_move
+
+    def _root(self, game, depth):
+        entry = self.tt.get(game.key())
+        best_move = None
+        alpha, beta = -WIN_SCORE - 1, WIN_SCORE + 1
+        for move in self._ordered_moves(game, entry[3] if entry else None):
+            score = -self._play_and_search(game, move, depth - 1, -beta, -alpha)
+            if best_move is None or score > alpha:
+                alpha, best_move = score, move
+        self._store(game, depth, EXACT, alpha, best_move)
+        return alpha, best_move
+
+    def _play_and_search(self, game, move, depth, alpha, beta):
+        game.drop_piece(move, game.current_player)
+        game.switch_player()
+        try:
+            return self._negamax(game, depth, alpha, beta)
+        finally:
+            game.switch_player()
+            game.undo_move(move)
+
+    def _negamax(self, game, depth, alpha, beta):
+        self.nodes += 1
+        if self._deadline is not None and self.nodes % TIME_CHECK == 0 and time.monotonic() >= self._deadline:
+            raise SearchTimeout
+        ply = game.move_count - self._root_count
+        if game.winner:
+            return -(WIN_SCORE - ply)  # O adversário acabou de ganhar
+        if game.winning_moves():
+            return WIN_SCORE - ply - 1
+        if game.is_tie():
+            return 0
+        player = game.current_player
+        if depth <= 0:
+            return game.score_position(player) - game.score_position(3 - player)
+
+        alpha_start = alpha
+        entry = self.tt.get(game.key())
+        tt_move = None
+        if entry is not None:
+            entry_depth, kind, value, tt_move = entry
+            if entry_depth >= depth:
+                value = self._from_tt(value, ply)
+                if kind == EXACT:
+                    return value
+                if kind == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        best_score, best_move = -WIN_SCORE - 1, None
+        for move in self._ordered_moves(game, tt_move):
+            score = -self._play_and_search(game, move, depth - 1, -beta, -alpha)
+            if score > best_score:
+                best_score, best_move = score, move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best_score <= alpha_start:
+            kind = UPPER
+        elif best_score >= beta:
+            kind = LOWER
+        else:
+            kind = EXACT
+        self._store(game, depth, kind, self._to_tt(best_score, ply), best_move)
+        return best_score
+
+    def _ordered_moves(self, game, first):
+        # Jogada da tabela primeiro, depois do centro para as bordas
+        valid = game.get_valid_locations()
+        moves = [move for move in CENTER_ORDER if move in valid and move != first]
+        moves += [move for move in valid if move not in CENTER_ORDER and move != first]
+        if first is not None and first in valid:
+            moves.insert(0, first)
+        return moves
+
+    def _store(self, game, depth, kind, value, move):
+        if len(self.tt) >= self.tt_size:
+            self.tt.clear()
+        self.tt[game.key()] = (depth, kind, value, move)
+
+    @staticmethod
+    def _to_tt(value, ply):
+        # Vitórias guardadas como distância a partir deste nó (não da raiz)
+        if value >= WIN_SCORE - 1000:
+            return value + ply
+        if value <= -WIN_SCORE + 1000:
+            return value - ply
+        return value
+
+    @staticmethod
+    def _from_tt(value, ply):
+        if value >= WIN_SCORE - 1000:
+            return value - ply
+        if value <= -WIN_SCORE + 1000:
+            return value + ply
+        return value
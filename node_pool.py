@@ -0,0 +1,198 @@
+import numpy as np
+
+
+def _aligned(nbytes):
+    return (nbytes + 7) // 8 * 8
+
+
+class NodePool:
+    """MCTS tree stored as parallel NumPy arrays (structure of arrays).
+
+    Node ``i`` is described by:
+
+        visits[i], wins[i]   statistics (wins of the player who moved into i)
+        parent[i]            index of the parent, -1 for the root
+        move[i], player[i]   column played to reach i and who played it
+        first_child[i]       index of the first child
+        num_children[i]      number of children (0 while unexpanded)
+        ref[i]               node holding the statistics and children of i
+        mirror[i]            1 if the position of i is the mirror of ref[i]
+
+    A node's children are allocated together, contiguously and in ascending
+    move order, so they occupy ``first_child[i]:first_child[i] + num_children[i]``.
+    Arrays start small and double when needed, up to ``max_nodes``; once the
+    cap is reached ``add_children`` refuses to allocate and the search keeps
+    working on the existing tree.
+
+    ``ref[i]`` is ``i`` itself unless a transposition table found the position
+    of ``i`` elsewhere in the tree: ``i`` is then an alias of that node and the
+    tree becomes a DAG. With mirror symmetry the shared node may hold the
+    mirrored position (``mirror[i] == 1``): its children's moves are then
+    read mirrored from ``i``.
+
+    Given a ``buffer`` (e.g. ``SharedMemory.buf``, at least
+    ``buffer_size(max_nodes)`` bytes) the arrays are fixed-size views into it,
+    node count included, so several processes can work on the same tree.
+    """
+
+    FIELDS = (
+        ("visits", np.int64),
+        ("wins", np.float64),
+        ("parent", np.int32),
+        ("first_child", np.int32),
+        ("num_children", np.int8),
+        ("move", np.int8),
+        ("player", np.int8),
+        ("ref", np.int32),
+        ("mirror", np.int8),
+    )
+
+    def __init__(self, max_nodes=1_000_000, capacity=1024, buffer=None):
+        self.max_nodes = max_nodes
+        if buffer is None:
+            self.capacity = min(capacity, max_nodes)
+            self._meta = np.zeros(1, dtype=np.int64)
+            for name, dtype in self.FIELDS:
+                setattr(self, name, np.zeros(self.capacity, dtype=dtype))
+            return
+
+        self.capacity = max_nodes
+        self._meta = np.ndarray(1, dtype=np.int64, buffer=buffer)
+        offset = self._meta.nbytes
+        for name, dtype in self.FIELDS:
+            array = np.ndarray(max_nodes, dtype=dtype, buffer=buffer, offset=offset)
+            setattr(self, name, array)
+            offset += _aligned(array.nbytes)
+
+    @classmethod
+    def buffer_size(cls, max_nodes):
+        """Bytes needed by a pool of ``max_nodes`` built on an external buffer."""
+        return 8 + sum(_aligned(max_nodes * np.dtype(dtype).itemsize) for _, dtype in cls.FIELDS)
+
+    @property
+    def size(self):
+        return int(self._meta[0])
+
+    @size.setter
+    def size(self, value):
+        self._meta[0] = value
+
+    def __len__(self):
+        return self.size
+
+    def nbytes(self):
+        """Memory used by the allocated arrays."""
+        return sum(getattr(self, name).nbytes for name, _ in self.FIELDS)
+
+    def _grow(self, needed):
+        new_capacity = min(max(self.capacity * 2, needed), self.max_nodes)
+        for name, dtype in self.FIELDS:
+            old = getattr(self, name)
+            new = np.zeros(new_capacity, dtype=dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+        self.capacity = new_capacity
+
+    def load(self, other):
+        """Replaces the contents of this pool with the nodes of ``other``."""
+        size = other.size
+        if size > self.capacity:
+            self._grow(size)
+        for name, _ in self.FIELDS:
+            getattr(self, name)[:size] = getattr(other, name)[:size]
+        self.size = size
+
+    def copy(self):
+        """Growable in-memory copy holding only the allocated nodes."""
+        pool = NodePool(self.max_nodes, capacity=max(self.size, 1))
+        pool.load(self)
+        return pool
+
+    def subtree(self, root):
+        """New in-memory pool holding only ``root`` and what is reachable from it.
+
+        Returns ``(pool, new_index)`` where ``new_index[i]`` is the index of old
+        node ``i`` in the new pool (-1 if it was dropped). Nodes keep their
+        relative order, so every children block stays contiguous and in move
+        order. Without transpositions ``root`` becomes node 0; otherwise nodes
+        shared through ``ref`` may have been created before it.
+        """
+        keep = np.zeros(self.size, dtype=bool)
+        expanded = np.zeros(self.size, dtype=bool)
+        keep[root] = True
+        level = np.array([root], dtype=np.int64)
+        while level.size:
+            expanded[level] = True
+            counts = self.num_children[level].astype(np.int64)
+            level, counts = level[counts > 0], counts[counts > 0]
+            if not level.size:
+                break
+            # Índices de todos os filhos do nível: first_child + 0..count-1
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            children = np.repeat(self.first_child[level].astype(np.int64), counts) + offsets
+            keep[children] = True
+            # Os filhos partilhados continuam pelo nó canónico (ref)
+            targets = np.unique(self.ref[children]).astype(np.int64)
+            keep[targets] = True
+            level = targets[~expanded[targets]]
+
+        order = np.flatnonzero(keep)
+        new_index = np.where(keep, np.cumsum(keep) - 1, -1).astype(np.int32)
+        size = len(order)
+        pool = NodePool(self.max_nodes, capacity=size)
+        for name, _ in self.FIELDS:
+            getattr(pool, name)[:size] = getattr(self, name)[order]
+        has_parent = pool.parent[:size] >= 0
+        pool.parent[:size][has_parent] = new_index[pool.parent[:size][has_parent]]
+        pool.parent[new_index[root]] = -1
+        pool.ref[:size] = new_index[pool.ref[:size]]
+        has_children = pool.num_children[:size] > 0
+        pool.first_child[:size][has_children] = new_index[pool.first_child[:size][has_children]]
+        pool.size = size
+        return pool, new_index
+
+    def add_root(self):
+        """Clears the pool and creates a root node, returning its index (0)."""
+        for name, _ in self.FIELDS:
+            getattr(self, name)[0] = 0
+        self.parent[0] = -1
+        self.size = 1
+        return 0
+
+    def add_children(self, node, moves, player):
+        """Allocates one child of ``node`` per move, all played by ``player``.
+
+        Returns the index of the first child, or -1 if ``max_nodes`` would be
+        exceeded (the node then stays unexpanded).
+        """
+        first = self.size
+        end = first + len(moves)
+        if end > self.capacity:
+            if end > self.max_nodes:
+                return -1
+            self._grow(end)
+        self.visits[first:end] = 0
+        self.wins[first:end] = 0
+        self.parent[first:end] = node
+        self.first_child[first:end] = 0
+        self.num_children[first:end] = 0
+        self.move[first:end] = moves
+        self.player[first:end] = player
+        self.ref[first:end] = np.arange(first, end)
+        self.mirror[first:end] = 0
+        self.first_child[node] = first
+        self.num_children[node] = len(moves)
+        self.size = end
+        return first
+
+    def children(self, node):
+        """Range of the children indices of ``node``."""
+        first = int(self.first_child[node])
+        return range(first, first + int(self.num_children[node]))
+
+    def find_child(self, node, move):
+        """Index of the child of ``node`` reached by ``move``, or None."""
+        for child in self.children(node):
+            if self.move[child] == move:
+                return child
+        return None
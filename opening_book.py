@@ -0,0 +1,217 @@
+"""Persistent opening book: root statistics of early positions.
+
+The book is one ``.npy`` file holding a structured array sorted by the
+canonical position key (``ConnectFour.canonical_key()``), so it is opened
+memory-mapped and a lookup is one ``np.searchsorted``. Each entry stores,
+per column in the canonical orientation:
+
+    visits   root visits (from MCTS runs and from dataset labels)
+    scored   the part of ``visits`` that came with win counts (MCTS runs)
+    wins     wins over those ``scored`` visits
+
+``BookBuilder`` collects statistics from ``MCTS`` searches and generated
+datasets and ``build`` keeps the positions up to ``max_ply`` pieces and, if
+there are more than ``max_entries``, the most visited ones.
+
+Usage: python opening_book.py [--dataset F] [--search-ply D] [--iterations N]
+                              [--max-ply P] [--max-entries M] [--output F]
+"""
+import argparse
+import os
+
+import numpy as np
+
+from connect_four import ConnectFour
+from dataset_store import VISIT_COLUMNS, column_view, feature_columns, open_dataset
+from mcts import MCTS
+from symmetry import canonical_keys
+
+DEFAULT_BOOK = "opening_book.npy"
+BOOK_DTYPE = np.dtype([
+    ("key", "<u8"),
+    ("ply", "<i1"),
+    ("visits", "<i4", (7,)),
+    ("scored", "<i4", (7,)),
+    ("wins", "<f4", (7,)),
+])
+
+
+class OpeningBook:
+    """Read-only view of a sorted book array (``BOOK_DTYPE``)."""
+
+    def __init__(self, entries=None):
+        self.entries = np.empty(0, dtype=BOOK_DTYPE) if entries is None else entries
+
+    @classmethod
+    def load(cls, path=DEFAULT_BOOK):
+        """Memory-maps a saved book; ValueError if the file is not one."""
+        entries = np.load(path, mmap_mode="r")
+        if entries.dtype != BOOK_DTYPE or entries.ndim != 1:
+            raise ValueError(f"{path}: not an opening book")
+        if len(entries) > 1 and not np.all(entries["key"][1:] > entries["key"][:-1]):
+            raise ValueError(f"{path}: keys are not sorted")
+        return cls(entries)
+
+    def save(self, path=DEFAULT_BOOK):
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, np.asarray(self.entries))
+        os.replace(path + ".tmp", path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, game):
+        """``(visits, scored, wins)`` of ``game`` in its own columns, or None."""
+        key, mirrored = game.canonical_key()
+        keys = self.entries["key"]
+        i = int(np.searchsorted(keys, key))
+        if i == len(keys) or keys[i] != key:
+            return None
+        entry = self.entries[i]
+        step = -1 if mirrored else 1
+        return entry["visits"][::step], entry["scored"][::step], entry["wins"][::step]
+
+    def root_statistics(self, game):
+        """Scored statistics as ``MCTS.root_statistics`` tuples, or None."""
+        found = self.lookup(game)
+        if found is None:
+            return None
+        _, scored, wins = found
+        statistics = [(move, int(scored[move]), float(wins[move]))
+                      for move in game.get_valid_locations() if scored[move] > 0]
+        return statistics or None
+
+    def best_move(self, game, min_visits=1):
+        """Most visited legal column, if the position has ``min_visits`` visits."""
+        found = self.lookup(game)
+        if found is None or found[0].sum() < min_visits:
+            return None
+        visits = found[0]
+        return max(game.get_valid_locations(), key=lambda move: visits[move])
+
+    def win_percentages(self, game):
+        found = self.lookup(game)
+        if found is None:
+            return {}
+        _, scored, wins = found
+        return {move: (100.0 * float(wins[move]) / int(scored[move]) if scored[move] else 0.0)
+                for move in game.get_valid_locations()}
+
+
+def load_book(path=DEFAULT_BOOK):
+    """The book at ``path``, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    return OpeningBook.load(path)
+
+
+class BookBuilder:
+    """Accumulates root statistics per canonical position."""
+
+    def __init__(self, rows=6, cols=7):
+        self.rows = rows
+        self.cols = cols
+        self._parts = []  # (keys, plies, visits, scored, wins) por bloco
+
+    def _add(self, keys, plies, visits, scored, wins):
+        self._parts.append((np.asarray(keys, dtype=np.uint64), np.asarray(plies), np.asarray(visits),
+                            np.asarray(scored), np.asarray(wins, dtype=np.float64)))
+
+    def add_search(self, mcts):
+        """Adds the root statistics of a finished ``MCTS`` search."""
+        game = mcts.game
+        key, mirrored = game.canonical_key()
+        visits = np.zeros(self.cols, dtype=np.int64)
+        wins = np.zeros(self.cols)
+        for move, move_visits, move_wins in mcts.root_statistics():
+            visits[move], wins[move] = move_visits, move_wins
+        if mirrored:
+            visits, wins = visits[::-1], wins[::-1]
+        self._add([key], [game.move_count], [visits], [visits], [wins])
+
+    def add_book(self, book):
+        entries = np.asarray(book.entries)
+        self._add(entries["key"], entries["ply"], entries["visits"], entries["scored"], entries["wins"])
+
+    def add_dataset(self, path):
+        """Adds a binary dataset: its visits_* columns, or one visit for ``move``."""
+        rows, header = open_dataset(path)
+        columns = header["columns"]
+        X = np.asarray(column_view(rows, header, [columns[i] for i in feature_columns(columns)]))
+        if all(name in columns for name in VISIT_COLUMNS):
+            visits = np.asarray(column_view(rows, header, VISIT_COLUMNS), dtype=np.int64)
+        else:
+            visits = np.zeros((len(X), self.cols), dtype=np.int64)
+            visits[np.arange(len(X)), np.asarray(column_view(rows, header, ["move"])[:, 0], dtype=np.int64)] = 1
+        # Num dataset canónico nenhuma linha é espelhada aqui
+        keys, flip = canonical_keys(X, self.rows, self.cols)
+        visits = np.where(flip[:, None], visits[:, ::-1], visits)
+        plies = np.count_nonzero(X[:, :self.rows * self.cols], axis=1)
+        self._add(keys, plies, visits, np.zeros_like(visits), np.zeros(visits.shape))
+
+    def build(self, max_ply=12, max_entries=100_000):
+        """Pools the statistics of each position into an ``OpeningBook``."""
+        if not self._parts:
+            return OpeningBook()
+        keys, plies, visits, scored, wins = (np.concatenate(part) for part in zip(*self._parts))
+        keep = plies <= max_ply
+        keys, plies, visits, scored, wins = keys[keep], plies[keep], visits[keep], scored[keep], wins[keep]
+        unique, first, group = np.unique(keys, return_index=True, return_inverse=True)
+        entries = np.zeros(len(unique), dtype=BOOK_DTYPE)
+        entries["key"] = unique
+        entries["ply"] = plies[first]
+        for name, values in (("visits", visits), ("scored", scored), ("wins", wins)):
+            pooled = np.zeros((len(unique), self.cols), dtype=values.dtype)
+            np.add.at(pooled, group.ravel(), values)
+            entries[name] = pooled
+        if len(entries) > max_entries:
+            # Ficam as posições mais visitadas, outra vez por ordem de chave
+            top = np.argsort(-entries["visits"].sum(axis=1), kind="stable")[:max_entries]
+            entries = entries[np.sort(top)]
+        return OpeningBook(entries)
+
+
+def search_openings(builder, max_ply, iterations):
+    """Runs an MCTS search on every (canonical) position up to ``max_ply`` pieces."""
+    seen = set()
+    frontier = [ConnectFour()]
+    for _ in range(max_ply + 1):
+        next_frontier = []
+        for game in frontier:
+            key, _ = game.canonical_key()
+            if key in seen or game.is_terminal():
+                continue
+            seen.add(key)
+            mcts = MCTS(game, iterations=iterations, symmetry=True)
+            mcts.run()
+            builder.add_search(mcts)
+            for move in game.get_valid_locations():
+                child = game.copy()
+                child.drop_piece(move, child.get_current_player())
+                child.switch_player()
+                next_frontier.append(child)
+        frontier = next_frontier
+    return len(seen)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", action="append", default=[], help="binary dataset (repeatable)")
+    parser.add_argument("--search-ply", type=int, default=-1, help="search every position up to this ply")
+    parser.add_argument("--iterations", type=int, default=5000, help="MCTS iterations per searched position")
+    parser.add_argument("--max-ply", type=int, default=12)
+    parser.add_argument("--max-entries", type=int, default=100_000)
+    parser.add_argument("--output", default=DEFAULT_BOOK)
+    parser.add_argument("--update", action="store_true", help="add to the existing book at --output")
+    args = parser.parse_args()
+
+    builder = BookBuilder()
+    if args.update and os.path.exists(args.output):
+        builder.add_book(OpeningBook.load(args.output))
+    for path in args.dataset:
+        builder.add_dataset(path)
+    if args.search_ply >= 0:
+        print(f"{search_openings(builder, args.search_ply, args.iterations)} positions searched")
+    book = builder.build(args.max_ply, args.max_entries)
+    book.save(args.output)
+    print(f"{len(book)} positions in {args.output}")
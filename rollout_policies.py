@@ -0,0 +1,61 @@
+"""Move choosers for the MCTS simulation phase.
+
+A rollout policy is any picklable callable ``policy(game) -> column`` that
+returns a valid move for the player to move; ``MCTS(rollout_policy=...)``
+accepts one directly or by name from ``ROLLOUT_POLICIES``. The tactical and
+greedy policies need the bitboard ``ConnectFour`` (``winning_moves`` and
+``score_move``).
+"""
+import random
+
+
+def random_rollout(game):
+    """Uniformly random move (the original MCTS rollout)."""
+    return random.choice(game.get_valid_locations())
+
+
+def tactical_rollout(game):
+    """Wins immediately if possible, else blocks an immediate loss, else random."""
+    moves = game.winning_moves()
+    if not moves:
+        moves = game.winning_moves(3 - game.current_player)
+    if not moves:
+        moves = game.get_valid_locations()
+    return random.choice(moves)
+
+
+class EpsilonGreedyRollout:
+    """Random move with probability ``epsilon``, otherwise the best ``score_move``.
+
+    Ties between equally scored moves are broken at random.
+    """
+
+    def __init__(self, epsilon=0.1):
+        self.epsilon = epsilon
+
+    def __call__(self, game):
+        moves = game.get_valid_locations()
+        if random.random() < self.epsilon:
+            return random.choice(moves)
+        scores = [game.score_move(move) for move in moves]
+        best = max(scores)
+        return random.choice([move for move, score in zip(moves, scores) if score == best])
+
+    def __repr__(self):
+        return f"EpsilonGreedyRollout(epsilon={self.epsilon})"
+
+
+ROLLOUT_POLICIES = {
+    "random": random_rollout,
+    "tactical": tactical_rollout,
+    "greedy": EpsilonGreedyRollout(),
+}
+
+
+def get_rollout_policy(policy):
+    """Resolves a policy name from ``ROLLOUT_POLICIES``; callables pass through."""
+    if callable(policy):
+        return policy
+    if policy not in ROLLOUT_POLICIES:
+        raise ValueError(f"unknown rollout policy {policy!r}, expected one of {sorted(ROLLOUT_POLICIES)}")
+    return ROLLOUT_POLICIES[policy]
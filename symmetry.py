@@ -0,0 +1,64 @@
+"""Horizontal mirror symmetry of the board for datasets and the ID3 model.
+
+A Connect Four position and its left-right mirror image have the same value
+and mirrored best moves. These helpers work on the flattened feature rows
+used by the dataset (``cell_0..cell_N`` row-major, followed by ``player``).
+The canonical orientation is the one ``ConnectFour.canonical_key()`` picks
+(the smaller position key), so dataset rows, search trees and the opening
+book agree on it.
+"""
+import numpy as np
+
+
+def mirror_board(board):
+    """Board array flipped left-right."""
+    return np.asarray(board)[:, ::-1]
+
+
+def mirror_move(move, cols=7):
+    return cols - 1 - move
+
+
+def mirror_permutation(rows=6, cols=7):
+    """Column order that mirrors a feature row (the player column stays put)."""
+    cells = np.arange(rows * cols).reshape(rows, cols)[:, ::-1].ravel()
+    return np.append(cells, rows * cols)
+
+
+def position_keys(X, rows=6, cols=7):
+    """``ConnectFour.key()`` of feature rows (cells row-major from the bottom, player)."""
+    X = np.asarray(X)
+    cells = np.arange(rows * cols)
+    weights = np.left_shift(np.uint64(1), ((cells % cols) * (rows + 1) + cells // cols).astype(np.uint64))
+    board = X[:, :rows * cols]
+    p1 = ((board == 1) * weights).sum(axis=1, dtype=np.uint64)
+    occupied = ((board != 0) * weights).sum(axis=1, dtype=np.uint64)
+    bottom = np.uint64(sum(1 << (c * (rows + 1)) for c in range(cols)))
+    player = (X[:, rows * cols].astype(np.uint64) - np.uint64(1)) << np.uint64(cols * (rows + 1))
+    return (p1 + occupied + bottom) | player
+
+
+def canonical_keys(X, rows=6, cols=7):
+    """``ConnectFour.canonical_key()`` of feature rows: ``(keys, mirrored)`` arrays."""
+    X = np.asarray(X)
+    keys = position_keys(X, rows, cols)
+    mirrored_keys = position_keys(X[:, mirror_permutation(rows, cols)], rows, cols)
+    mirrored = mirrored_keys < keys
+    return np.where(mirrored, mirrored_keys, keys), mirrored
+
+
+def canonical_features(X, y=None, rows=6, cols=7):
+    """Puts every row of ``X`` in canonical orientation.
+
+    The canonical orientation is the one with the smaller position key (as
+    in ``ConnectFour.canonical_key()``), so both images of a position end up
+    identical. Labels in ``y`` (columns) are mirrored along with their rows.
+    Returns ``(X, y, mirrored)``, where ``mirrored`` flags the rows that were
+    flipped.
+    """
+    X = np.asarray(X)
+    _, mirrored = canonical_keys(X, rows, cols)
+    X = np.where(mirrored[:, None], X[:, mirror_permutation(rows, cols)], X)
+    if y is not None:
+        y = np.where(mirrored, mirror_move(np.asarray(y), cols), y)
+    return X, y, mirrored
@@ -1,25 +1,37 @@
 import pandas as pd
+import sys
 import time
 from tqdm import tqdm
 
 from ID3_MCTS import predict_connect4_move
 from connect_four import ConnectFour
 
-from mcts import MCTS
-import pickle
-from ID3_MCTS import DecisionTree, train_tree, predict_connect4_move
-import pickle
+from mcts import MCTSSession
+from model_store import load_or_train
+from negamax import AlphaBeta
+from opening_book import load_book
 
 num_games = 50 # Número de partidas a simular
-csv_filename = "tempos_mcts_vs_id3.csv"
+# Adversário do ID3: "mcts" (predefinido) ou "alphabeta" (python tempo.py alphabeta)
+motor = sys.argv[1] if len(sys.argv) > 1 else "mcts"
+if motor not in ("mcts", "alphabeta"):
+    sys.exit(f"Motor desconhecido: {motor} (usa mcts ou alphabeta)")
+nome_motor = {"mcts": "MCTS", "alphabeta": "Alpha-Beta"}[motor]
+# Ficheiros e colunas com o nome do motor, para não misturar os resultados
+csv_filename = f"tempos_{motor}_vs_id3.csv"
+coluna_motor = f"tempo_medio_{motor}"
+png_filename = f"tempo_medio_{motor}_vs_id3_ms.png"
 resultados = []
-import pickle
-with open("connect4_tree.pkl", "rb") as f:
-    tree = pickle.load(f)
+tree = load_or_train()
+book = load_book()  # Livro de aberturas (opening_book.py), se existir
 
 
 for _ in tqdm(range(num_games), desc=" partidas"):
     game = ConnectFour()
+    if motor == "alphabeta":
+        sessao = AlphaBeta(time_limit_ms=200)  # Mesma interface: search(game)
+    else:
+        sessao = MCTSSession(iterations=400, book=book)  # Reaproveita a árvore entre jogadas
     moves_this_game = 0
     tempos_mcts = []
     tempos_id3 = []
@@ -27,11 +39,9 @@ for _ in tqdm(range(num_games), desc=" partidas"):
 
     while not game.check_win(1) and not game.check_win(2) and not game.is_tie():
         if game.get_current_player() == 1:
-            # MCTS joga
+            # MCTS (ou Alpha-Beta) joga
             start = time.time()
-            mcts = MCTS(game, iterations=400)
-            mcts.run()
-            move = mcts.get_best_move()
+            move = sessao.search(game)
             end = time.time()
             tempos_mcts.append(end - start)
         else:
@@ -57,9 +67,10 @@ for _ in tqdm(range(num_games), desc=" partidas"):
     tempo_medio_id3 = sum(tempos_id3) / len(tempos_id3) if tempos_id3 else 0
 
     resultados.append({
+        "motor": motor,
         "num_jogadas": moves_this_game,
         "vencedor": vencedor,
-        "tempo_medio_mcts": tempo_medio_mcts,
+        coluna_motor: tempo_medio_mcts,
         "tempo_medio_id3": tempo_medio_id3
     })
 
@@ -69,15 +80,15 @@ df.to_csv(csv_filename, index=False)
 print(f"CSV '{csv_filename}' gerado com sucesso!")
 
 # Estatísticas rápidas e gráfico dos tempos
-media_mcts = df['tempo_medio_mcts'].mean()
+media_mcts = df[coluna_motor].mean()
 media_id3 = df['tempo_medio_id3'].mean()
-print(f"Tempo médio MCTS: {media_mcts:.4f} s")
+print(f"Tempo médio {nome_motor}: {media_mcts:.4f} s")
 print(f"Tempo médio ID3: {media_id3:.4f} s")
 
 import matplotlib.pyplot as plt
 plt.figure(figsize=(6,4))
-plt.bar(['MCTS', 'ID3'], [media_mcts, media_id3 * 1000], color=['royalblue', 'orange'])
+plt.bar([nome_motor, 'ID3'], [media_mcts, media_id3 * 1000], color=['royalblue', 'orange'])
 plt.ylabel('Tempo médio por jogada (ms)')
-plt.title('Tempo Médio de Decisão por Jogada (MCTS vs ID3)')
-plt.savefig('tempo_medio_mcts_vs_id3_ms.png')
+plt.title(f'Tempo Médio de Decisão por Jogada ({nome_motor} vs ID3)')
+plt.savefig(png_filename)
 plt.show()
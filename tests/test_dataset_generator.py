@@ -0,0 +1,34 @@
+import random
+
+import numpy as np
+
+import dataset_generator
+from connect_four import ConnectFour
+from dataset_store import VISIT_COLUMNS, column_view, open_dataset
+
+ITERATIONS = 60
+
+
+def _visits(path):
+    rows, header = open_dataset(path)
+    return np.asarray(column_view(rows, header, VISIT_COLUMNS)), column_view(rows, header, ["move"])[:, 0]
+
+
+def test_visit_totals_match_iterations(tmp_path):
+    random.seed(0)
+    path = str(tmp_path / "shard_0000.c4")
+    dataset_generator.generate_shard(path, 12, "0:0", ITERATIONS)
+    visits, _ = _visits(path)
+    assert len(visits)
+    assert (visits.sum(axis=1) == ITERATIONS).all()
+
+
+def test_symmetric_root_is_not_double_counted(tmp_path, monkeypatch):
+    # O tabuleiro vazio é simétrico: os filhos espelhados partilham um nó
+    monkeypatch.setattr(dataset_generator, "_random_position", lambda rng: ConnectFour())
+    path = str(tmp_path / "shard_0000.c4")
+    dataset_generator.generate_shard(path, 3, "0:0", ITERATIONS)
+    visits, moves = _visits(path)
+    assert len(visits) == 1  # A mesma posição só é pesquisada uma vez
+    assert visits[0].sum() == ITERATIONS
+    assert visits[0, moves[0]] == visits[0].max()
@@ -0,0 +1,33 @@
+import random
+
+from connect_four import ConnectFour
+from mcts import MCTS
+
+
+def test_run_returns_iterations_with_leaf_rollouts():
+    random.seed(0)
+    mcts = MCTS(ConnectFour(), iterations=200, leaf_rollouts=8)
+    assert mcts.run() == 200
+    assert int(mcts.pool.visits[mcts.root]) == 200 * 8
+
+
+def test_search_anytime_uses_all_iterations_with_leaf_rollouts():
+    random.seed(0)
+    mcts = MCTS(ConnectFour(), iterations=2000, leaf_rollouts=8)
+    for move, percentages in mcts.search_anytime(interval_ms=20):
+        assert move is not None and percentages
+    assert int(mcts.pool.visits[mcts.root]) == 2000 * 8
+
+
+def test_root_parallel_search_carries_no_visits():
+    from mcts import MCTSSession
+
+    random.seed(0)
+    session = MCTSSession(iterations=400, workers=2, parallel="root")
+    game = ConnectFour()
+    move = session.search(game)
+    game.drop_piece(move, game.get_current_player())
+    game.switch_player()
+    # O filho escolhido só tem as visitas somadas dos processos, sem subárvore
+    session.search(game)
+    assert session.carried_visits == 0
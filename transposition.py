@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+
+class TranspositionTable:
+    """Bounded map from position key (``ConnectFour.key()``) to a tree node.
+
+    Each entry is ``(node, mirrored)``; ``mirrored`` is set when the key is
+    mirror-normalized (``ConnectFour.canonical_key()``) and the node's own
+    position is the mirror image of the canonical one.
+
+    Entries are evicted least-recently-used first once ``capacity`` is
+    reached; an evicted position simply stops being shared and gets its own
+    node the next time it is reached. ``lookups``, ``hits`` and
+    ``evictions`` count what the table did.
+    """
+
+    def __init__(self, capacity=1_000_000):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """``(node, mirrored)`` stored for ``key``, or None."""
+        self.lookups += 1
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, node, mirrored=False):
+        self.entries[key] = (node, mirrored)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def remap(self, new_index):
+        """Renumbers entries after the tree is compacted (-1 marks dropped nodes)."""
+        self.entries = OrderedDict(
+            (key, (int(new_index[node]), mirrored))
+            for key, (node, mirrored) in self.entries.items() if new_index[node] >= 0
+        )